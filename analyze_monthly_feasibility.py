@@ -5,6 +5,9 @@ Analisi dettagliata della fattibilità mensile del modello.
 """
 
 from pathlib import Path
+
+import numpy as np
+
 from parser.nurse_loader import load_nurses
 from parser.hard_constraint_loader import load_hard_constraints
 from utils.enums import ShiftType
@@ -26,12 +29,13 @@ def analyze_monthly_feasibility():
     num_days = 31
     num_weekends = 5  # Assumiamo 5 weekend in un mese di 31 giorni
 
+    # Indice tipo -> vincolo (prima occorrenza, come con next()), costruito una volta
+    by_type = {c["type"]: c for c in reversed(hard_constraints)}
+
     # Estrai requisiti copertura
     coverage = {"morning": 2, "afternoon": 2, "night": 1}
-    for constraint in hard_constraints:
-        if constraint["type"] == "coverage_minimum":
-            coverage = constraint["params"]
-            break
+    if "coverage_minimum" in by_type:
+        coverage = by_type["coverage_minimum"]["params"]
 
     print(f"\n📊 PARAMETRI BASE:")
     print(f"   Giorni: {num_days}")
@@ -53,7 +57,9 @@ def analyze_monthly_feasibility():
 
     # Calcola capacità teorica
     print(f"\n💪 CAPACITÀ TEORICA:")
-    ore_totali = sum(n.contracted_hours for n in nurses)
+    # Ore contrattuali in un array: somma in C, riusabile per analisi per infermiere
+    contracted_hours = np.fromiter((n.contracted_hours for n in nurses), dtype=np.int64, count=len(nurses))
+    ore_totali = int(contracted_hours.sum())
     turni_teorici = ore_totali // 8
     print(f"   Ore contrattuali totali: {ore_totali}h")
     print(f"   Turni teorici massimi: {turni_teorici}")
@@ -63,7 +69,7 @@ def analyze_monthly_feasibility():
     print(f"\n⚠️  VINCOLI CRITICI:")
 
     # 1. Weekend liberi
-    weekend_constraint = next((c for c in hard_constraints if c["type"] == "weekend_rest_monthly"), None)
+    weekend_constraint = by_type.get("weekend_rest_monthly")
     if weekend_constraint:
         free_weekends = weekend_constraint["params"]["free_weekends"]
         print(f"\n   1. WEEKEND LIBERI: {free_weekends} per infermiere")
@@ -82,7 +88,7 @@ def analyze_monthly_feasibility():
             print(f"      ✅ Fattibile con margine di {giorni_weekend_lavorabili - turni_weekend_necessari}")
 
     # 2. Notti con smonto
-    if any(c["type"] in ["mandatory_smonto_after_night", "mandatory_rest_after_smonto"] for c in hard_constraints):
+    if {"mandatory_smonto_after_night", "mandatory_rest_after_smonto"} & by_type.keys():
         print(f"\n   2. VINCOLO NOTTE→SMONTO→RIPOSO:")
         print(f"      Ogni notte richiede 3 giorni (N + S + R)")
         print(f"      {turni_notte} notti → {turni_notte * 3} giorni-persona necessari")
@@ -91,7 +97,7 @@ def analyze_monthly_feasibility():
         print(f"      Solo per le notti servono: {(turni_notte * 3 / giorni_persona_totali) * 100:.1f}% della capacità")
 
     # 3. Bilanciamento turni
-    balance_constraint = next((c for c in hard_constraints if c["type"] == "shift_balance_morning_afternoon"), None)
+    balance_constraint = by_type.get("shift_balance_morning_afternoon")
     if balance_constraint:
         max_disc = balance_constraint["params"]["max_discrepancy"]
         print(f"\n   3. BILANCIAMENTO M/P: max discrepanza {max_disc * 100:.0f}%")
@@ -100,7 +106,7 @@ def analyze_monthly_feasibility():
         print(f"      Range ammesso: {turni_medi * (1 - max_disc):.1f} - {turni_medi * (1 + max_disc):.1f}")
 
     # 4. Max notti mensili
-    max_nights_constraint = next((c for c in hard_constraints if c["type"] == "max_nights_per_month"), None)
+    max_nights_constraint = by_type.get("max_nights_per_month")
     if max_nights_constraint:
         max_nights = max_nights_constraint["params"]["max_monthly"]
         print(f"\n   4. MAX NOTTI MENSILI: {max_nights} per infermiere")
@@ -5,21 +5,45 @@ Script di debug per analizzare dettagliatamente i vincoli OR-Tools
 e identificare conflitti che impediscono di trovare soluzioni.
 """
 
+import os
 from pathlib import Path
 from parser.nurse_loader import load_nurses
 from parser.hard_constraint_loader import load_hard_constraints
 from parser.soft_constraint_loader import load_soft_constraints
 from model.constraint_registry import registry
+from model.scheduler import Scheduler
 from utils.enums import ShiftType
 from ortools.sat.python import cp_model
 import sys
 
+# Output bufferizzato: le righe vengono scritte in blocco prima di ogni
+# risoluzione (così l'avanzamento resta visibile) e a fine esecuzione.
+_output_lines = []
+_log = _output_lines.append
+
+
+_STATUS_NAMES = {
+    cp_model.UNKNOWN: "UNKNOWN",
+    cp_model.MODEL_INVALID: "MODEL_INVALID",
+    cp_model.FEASIBLE: "FEASIBLE",
+    cp_model.INFEASIBLE: "INFEASIBLE",
+    cp_model.OPTIMAL: "OPTIMAL"
+}
+
+
+def _flush_log():
+    """Scrive su stdout con una sola write le righe accumulate."""
+    if _output_lines:
+        sys.stdout.write("\n".join(_output_lines) + "\n")
+        sys.stdout.flush()
+        _output_lines.clear()
+
 
 def debug_problem():
     """Analizza step-by-step la costruzione del problema."""
 
-    print("🔍 DEBUG OR-TOOLS - ANALISI DETTAGLIATA")
-    print("=" * 60)
+    _log("🔍 DEBUG OR-TOOLS - ANALISI DETTAGLIATA")
+    _log("=" * 60)
 
     # Carica dati
     DATA_DIR = Path("data")
@@ -29,100 +53,93 @@ def debug_problem():
 
     num_days = 7
 
-    print(f"\n📊 DATI CARICATI:")
-    print(f"   Infermieri: {len(nurses)}")
-    print(f"   Hard constraints: {len(hard_constraints)}")
-    print(f"   Soft constraints: {len(soft_constraints)}")
-    print(f"   Giorni: {num_days}")
+    _log(f"\n📊 DATI CARICATI:")
+    _log(f"   Infermieri: {len(nurses)}")
+    _log(f"   Hard constraints: {len(hard_constraints)}")
+    _log(f"   Soft constraints: {len(soft_constraints)}")
+    _log(f"   Giorni: {num_days}")
 
     # Crea modello base
     model = cp_model.CpModel()
 
-    print(f"\n🏗️ CREAZIONE VARIABILI:")
-    nurse_shift = {}
-    var_count = 0
-
-    for n_idx in range(len(nurses)):
-        for d in range(num_days):
-            for s in ShiftType:
-                var = model.NewBoolVar(f"n{n_idx}_d{d}_s{s.value}")
-                nurse_shift[n_idx, d, s.value] = var
-                var_count += 1
+    _log(f"\n🏗️ CREAZIONE VARIABILI:")
+    nurse_shift = {
+        (n_idx, d, s.value): model.NewBoolVar(f"n{n_idx}_d{d}_s{s.value}")
+        for n_idx in range(len(nurses))
+        for d in range(num_days)
+        for s in ShiftType
+    }
 
-    print(f"   Variabili create: {var_count}")
+    _log(f"   Variabili create: {len(nurse_shift)}")
 
     # Analizza vincoli hard uno per uno
-    print(f"\n🔒 ANALISI VINCOLI HARD:")
+    _log(f"\n🔒 ANALISI VINCOLI HARD:")
 
     # 1. Vincolo built-in: un solo turno per giorno
-    print(f"\n   1️⃣ UN TURNO PER GIORNO:")
+    _log(f"\n   1️⃣ UN TURNO PER GIORNO:")
     builtin_constraints = 0
     for n_idx in range(len(nurses)):
         for d in range(num_days):
             model.Add(
-                sum(nurse_shift[n_idx, d, s.value] for s in ShiftType) <= 1
+                cp_model.LinearExpr.Sum([nurse_shift[n_idx, d, s.value] for s in ShiftType]) <= 1
             )
             builtin_constraints += 1
-    print(f"      Vincoli aggiunti: {builtin_constraints}")
+    _log(f"      Vincoli aggiunti: {builtin_constraints}")
 
     # 2. Fallback coverage
-    print(f"\n   2️⃣ COPERTURA FALLBACK:")
+    _log(f"\n   2️⃣ COPERTURA FALLBACK:")
     coverage_constraints = 0
     min_coverage = {ShiftType.MORNING: 2, ShiftType.AFTERNOON: 2, ShiftType.NIGHT: 1}
 
     for d in range(num_days):
         for shift in ShiftType:
             model.Add(
-                sum(
+                cp_model.LinearExpr.Sum([
                     nurse_shift[n_idx, d, shift.value]
                     for n_idx in range(len(nurses))
-                )
+                ])
                 >= min_coverage[shift]
             )
             coverage_constraints += 1
-    print(f"      Vincoli aggiunti: {coverage_constraints}")
+    _log(f"      Vincoli aggiunti: {coverage_constraints}")
 
     # 3. Registry constraints
-    print(f"\n   3️⃣ VINCOLI DA REGISTRY:")
+    _log(f"\n   3️⃣ VINCOLI DA REGISTRY:")
     for i, constraint in enumerate(hard_constraints):
         c_type = constraint["type"]
-        print(f"      {i + 1}. {c_type}: {constraint['params']}")
+        _log(f"      {i + 1}. {c_type}: {constraint['params']}")
 
         handler = registry.hard.get(c_type)
         if handler:
             try:
                 handler(model, nurse_shift, nurses, constraint["params"], num_days)
-                print(f"         ✅ Applicato")
+                _log(f"         ✅ Applicato")
             except Exception as e:
-                print(f"         ❌ Errore: {e}")
+                _log(f"         ❌ Errore: {e}")
         else:
-            print(f"         ❌ Handler non trovato")
+            _log(f"         ❌ Handler non trovato")
 
     # Test risoluzione solo con hard constraints
-    print(f"\n🧪 TEST RISOLUZIONE (SOLO HARD CONSTRAINTS):")
+    _log(f"\n🧪 TEST RISOLUZIONE (SOLO HARD CONSTRAINTS):")
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = 30.0
 
+    _flush_log()
     status = solver.Solve(model)
-    status_names = {
-        cp_model.UNKNOWN: "UNKNOWN",
-        cp_model.MODEL_INVALID: "MODEL_INVALID",
-        cp_model.FEASIBLE: "FEASIBLE",
-        cp_model.INFEASIBLE: "INFEASIBLE",
-        cp_model.OPTIMAL: "OPTIMAL"
-    }
-
-    print(f"   Status: {status_names.get(status, status)}")
+    _log(f"   Status: {_STATUS_NAMES.get(status, status)}")
 
     if status == cp_model.INFEASIBLE:
-        print(f"   ❌ PROBLEMA: I vincoli HARD sono già infeasibili!")
-        print(f"   🔍 Analizza i vincoli hard uno per uno...")
+        _log(f"   ❌ PROBLEMA: I vincoli HARD sono già infeasibili!")
+        if os.environ.get("DEBUG_CONSTRAINTS"):
+            _bisect_failing_constraint(nurses, hard_constraints, num_days)
+        else:
+            _log(f"   🔍 Imposta DEBUG_CONSTRAINTS=1 per individuare il vincolo in conflitto")
         return False
     elif status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        print(f"   ✅ Hard constraints OK")
+        _log(f"   ✅ Hard constraints OK")
 
         # Estrai soluzione di base
-        print(f"\n📋 SOLUZIONE BASE (senza soft constraints):")
+        _log(f"\n📋 SOLUZIONE BASE (senza soft constraints):")
         total_shifts = [0] * len(nurses)
 
         for n_idx in range(len(nurses)):
@@ -132,22 +149,72 @@ def debug_problem():
                     if solver.Value(nurse_shift[n_idx, d, s.value]) == 1:
                         shifts_count += 1
             total_shifts[n_idx] = shifts_count
-            print(f"      {nurses[n_idx].name}: {shifts_count} turni")
+            _log(f"      {nurses[n_idx].name}: {shifts_count} turni")
 
         avg_shifts = sum(total_shifts) / len(total_shifts)
         variance = sum((s - avg_shifts) ** 2 for s in total_shifts) / len(total_shifts)
-        print(f"      Media: {avg_shifts:.1f}, Varianza: {variance:.2f}")
+        _log(f"      Media: {avg_shifts:.1f}, Varianza: {variance:.2f}")
 
         # Test con soft constraints
-        print(f"\n🎯 TEST CON SOFT CONSTRAINTS:")
+        _log(f"\n🎯 TEST CON SOFT CONSTRAINTS:")
         test_with_soft_constraints(model, nurse_shift, nurses, soft_constraints, num_days)
 
         return True
     else:
-        print(f"   ⚠️ Status sconosciuto: {status}")
+        _log(f"   ⚠️ Status sconosciuto: {status}")
         return False
 
 
+def _bisect_failing_constraint(nurses, hard_constraints, num_days, max_seconds=10.0):
+    """
+    Individua per bisezione il primo vincolo hard che rende il problema infeasible.
+
+    Aggiungere vincoli può solo restringere lo spazio delle soluzioni, quindi
+    basta cercare il prefisso più corto di hard_constraints che è infeasible:
+    servono ~log2(N) risoluzioni invece di N, tutte sullo stesso Scheduler.
+
+    :param nurses: lista infermieri
+    :param hard_constraints: lista completa dei vincoli hard
+    :param num_days: giorni del periodo
+    :param max_seconds: tempo massimo per ogni tentativo
+    :return: indice del vincolo in conflitto, -1 se già i vincoli built-in
+        sono infeasibili, None se nessun prefisso risulta infeasible
+    """
+
+    # Un solo Scheduler: le variabili decisionali vengono create una volta sola
+    scheduler = Scheduler(nurses, [], [], num_days)
+
+    def is_infeasible(k):
+        scheduler._clear_constraints()
+        scheduler._apply_builtin_constraints()
+        scheduler._apply_hard_constraints(hard_constraints[:k])
+        _flush_log()
+        status, _ = scheduler._solve_model(max_seconds)
+        _log(f"      Primi {k} vincoli: {'❌ INFEASIBLE' if status == cp_model.INFEASIBLE else '✅ OK'}")
+        return status == cp_model.INFEASIBLE
+
+    _log(f"\n   🔍 BISEZIONE SUI VINCOLI HARD:")
+    if is_infeasible(0):
+        _log(f"   ❌ Già i vincoli built-in (un turno/giorno, copertura) sono infeasibili")
+        return -1
+    if not is_infeasible(len(hard_constraints)):
+        _log(f"   ⚠️ Nessun prefisso infeasible entro il tempo limite")
+        return None
+
+    # Invariante: prefisso lo feasible, prefisso hi infeasible
+    lo, hi = 0, len(hard_constraints)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if is_infeasible(mid):
+            hi = mid
+        else:
+            lo = mid
+
+    culprit = hard_constraints[hi - 1]
+    _log(f"   🎯 Vincolo in conflitto: #{hi} {culprit['type']}: {culprit['params']}")
+    return hi - 1
+
+
 def test_with_soft_constraints(model, nurse_shift, nurses, soft_constraints, num_days):
     """Testa l'aggiunta di soft constraints."""
 
@@ -157,7 +224,7 @@ def test_with_soft_constraints(model, nurse_shift, nurses, soft_constraints, num
         c_type = constraint["type"]
         weight = constraint.get("weight", 1)
 
-        print(f"   Aggiungendo {c_type} (weight={weight})...")
+        _log(f"   Aggiungendo {c_type} (weight={weight})...")
 
         handler = registry.soft.get(c_type)
         if handler:
@@ -168,51 +235,50 @@ def test_with_soft_constraints(model, nurse_shift, nurses, soft_constraints, num
                 )
                 if terms:
                     objective_terms.extend(terms)
-                    print(f"      ✅ {len(terms)} termini aggiunti")
+                    _log(f"      ✅ {len(terms)} termini aggiunti")
                 else:
-                    print(f"      ⚠️ Nessun termine generato")
+                    _log(f"      ⚠️ Nessun termine generato")
             except Exception as e:
-                print(f"      ❌ Errore: {e}")
+                _log(f"      ❌ Errore: {e}")
                 import traceback
+                _flush_log()
                 traceback.print_exc()
         else:
-            print(f"      ❌ Handler non trovato")
+            _log(f"      ❌ Handler non trovato")
 
     if objective_terms:
-        print(f"   📊 Funzione obiettivo: {len(objective_terms)} termini")
+        _log(f"   📊 Funzione obiettivo: {len(objective_terms)} termini")
 
         # Costruisci obiettivo
-        objective_expr = sum(term.expr * term.weight for term in objective_terms)
+        objective_expr = cp_model.LinearExpr.WeightedSum(
+            [term.expr for term in objective_terms],
+            [term.weight for term in objective_terms],
+        )
         model.Maximize(objective_expr)
 
         # Risolvi con soft constraints
         solver = cp_model.CpSolver()
         solver.parameters.max_time_in_seconds = 60.0
+        _flush_log()
         status = solver.Solve(model)
 
-        status_names = {
-            cp_model.UNKNOWN: "UNKNOWN",
-            cp_model.MODEL_INVALID: "MODEL_INVALID",
-            cp_model.FEASIBLE: "FEASIBLE",
-            cp_model.INFEASIBLE: "INFEASIBLE",
-            cp_model.OPTIMAL: "OPTIMAL"
-        }
-
-        print(f"   Status finale: {status_names.get(status, status)}")
+        _log(f"   Status finale: {_STATUS_NAMES.get(status, status)}")
 
         if status == cp_model.INFEASIBLE:
-            print(f"   ❌ PROBLEMA: Soft constraints rendono il problema infeasible!")
+            _log(f"   ❌ PROBLEMA: Soft constraints rendono il problema infeasible!")
         elif status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            print(f"   ✅ Soluzione trovata con soft constraints")
+            _log(f"   ✅ Soluzione trovata con soft constraints")
     else:
-        print(f"   ⚠️ Nessun termine nell'obiettivo")
+        _log(f"   ⚠️ Nessun termine nell'obiettivo")
 
 
 if __name__ == "__main__":
     try:
         debug_problem()
+        _flush_log()
     except Exception as e:
-        print(f"\n❌ Errore nel debug: {e}")
+        _log(f"\n❌ Errore nel debug: {e}")
+        _flush_log()
         import traceback
 
         traceback.print_exc()
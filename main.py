@@ -5,6 +5,7 @@ Passa il giorno della settimana di partenza al Scheduler.
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from parser.nurse_loader import load_nurses
@@ -15,7 +16,10 @@ from parser.solution_analyzer import SolutionAnalyzer
 from model.scheduler import Scheduler
 from ortools.sat.python import cp_model
 
+from utils.config import FAST_MODEL_BUILD
+from utils.enums import ShiftType
 from utils.date_manager import get_next_month_period, DateManager
+from utils.ortools_fast import fast_build
 from utils.schedule_formatter import ScheduleFormatter
 
 
@@ -30,7 +34,22 @@ SOFT_CONSTRAINTS_FILE = DATA_DIR / "soft_constraints.json"
 
 # ============================== FUNZIONI RIUTILIZZABILI =============================
 
-def solve_model(nurses, hard_constraints, soft_constraints, num_days, start_weekday=0, max_seconds=120.0, hints=None):
+def load_configuration(nurses_file, hard_constraints_file, soft_constraints_file):
+    """
+    Carica in parallelo infermieri, vincoli hard e vincoli soft.
+    I tre file sono indipendenti: il tempo totale è quello del più lento.
+
+    :return: (nurses, hard_constraints, soft_constraints)
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        f_nurses = executor.submit(load_nurses, nurses_file)
+        f_hard = executor.submit(load_hard_constraints, hard_constraints_file)
+        f_soft = executor.submit(load_soft_constraints, soft_constraints_file)
+    return f_nurses.result(), f_hard.result(), f_soft.result()
+
+
+def solve_model(nurses, hard_constraints, soft_constraints, num_days, start_weekday=0, max_seconds=120.0, hints=None,
+                num_workers=None):
     """
     Funzione riutilizzabile per risolvere il modello di scheduling.
     
@@ -41,6 +60,7 @@ def solve_model(nurses, hard_constraints, soft_constraints, num_days, start_week
     :param start_weekday: giorno settimana di partenza (0=lun)
     :param max_seconds: tempo massimo risoluzione
     :param hints: dizionario con hint per warm-start {(nurse_idx, day, shift): value}
+    :param num_workers: worker paralleli CP-SAT (None = default del solver)
     :return: (status, schedule) tupla con stato e soluzione
     """
     scheduler = Scheduler(
@@ -51,11 +71,35 @@ def solve_model(nurses, hard_constraints, soft_constraints, num_days, start_week
         start_weekday=start_weekday
     )
     
-    # Applica hints se forniti
-    if hints:
-        scheduler.set_hints(hints)
-    
-    return scheduler.solve(max_seconds=max_seconds)
+    # La costruzione del modello avviene dentro solve(): i controlli di
+    # OR-Tools vengono saltati solo se FAST_MODEL_BUILD è attivo
+    with fast_build(enabled=FAST_MODEL_BUILD):
+        return scheduler.solve(max_seconds=max_seconds, num_workers=num_workers, hints=hints)
+
+
+def hints_from_schedule(schedule, nurses):
+    """
+    Converte un piano già calcolato negli hint di warm-start per solve_model.
+    Gli infermieri non più presenti vengono ignorati.
+
+    :param schedule: piano nel formato restituito da solve_model
+    :param nurses: lista di infermieri del nuovo modello
+    :return: dizionario {(nurse_idx, day, shift_value): 0/1} per tutte le variabili
+    """
+    name_to_idx = {nurse.name: idx for idx, nurse in enumerate(nurses)}
+    hints = {
+        (n_idx, d, s.value): 0
+        for n_idx in range(len(nurses))
+        for d in range(len(schedule))
+        for s in ShiftType
+    }
+    for d, day_data in enumerate(schedule):
+        for s in ShiftType:
+            for name in day_data.get(s.name.lower(), []):
+                n_idx = name_to_idx.get(name)
+                if n_idx is not None:
+                    hints[n_idx, d, s.value] = 1
+    return hints
 
 
 # ============================== ESECUZIONE =======================================
@@ -77,9 +121,9 @@ def main():
         date_labels = dm.generate_date_labels(start_date, num_days)
 
         # Carica configurazione
-        nurses = load_nurses(NURSES_FILE)
-        hard_constraints = load_hard_constraints(HARD_CONSTRAINTS_FILE)
-        soft_constraints = load_soft_constraints(SOFT_CONSTRAINTS_FILE)
+        nurses, hard_constraints, soft_constraints = load_configuration(
+            NURSES_FILE, HARD_CONSTRAINTS_FILE, SOFT_CONSTRAINTS_FILE
+        )
 
         print(f"👥 Infermieri caricati: {len(nurses)}")
         print(f"🔒 Vincoli rigidi:      {len(hard_constraints)}")
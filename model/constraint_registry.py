@@ -17,12 +17,19 @@ CORRETTO: Gestione corretta di SMONTO in tutti i vincoli.
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Callable, List
+from math import gcd
+from typing import Dict, Callable, List, Set, Tuple
 
 from ortools.sat.python import cp_model
 
-from utils.enums import ShiftType
+from utils.enums import ShiftType, WORKING_SHIFT_VALS, ALL_SHIFT_VALS
+from model.model_context import get_model_context
 from model.nurse import Nurse
+from utils.date_manager import weekend_pairs
+from utils.ortools_fast import add_at_most_one_constraints, add_sum_constraints
+
+# Valori dei turni come costanti di modulo: niente accessi all'enum nei cicli N·D·S
+M, A, N, SM = ShiftType.MORNING.value, ShiftType.AFTERNOON.value, ShiftType.NIGHT.value, ShiftType.SMONTO.value
 
 @dataclass
 class SoftTerm:
@@ -51,6 +58,142 @@ class ConstraintRegistry:
 
 registry = ConstraintRegistry()
 
+
+def model_stats(model: cp_model.CpModel) -> Dict[str, int]:
+    """
+    Conta i vincoli del modello e quelli reificati (con enforcement
+    literal, cioè creati con OnlyEnforceIf) emessi dagli handler.
+
+    :param model: modello CP-SAT già costruito
+    :return: {"constraints": totale, "reified": reificati}
+    """
+    constraints = model.Proto().constraints
+    return {
+        "constraints": len(constraints),
+        "reified": sum(1 for c in constraints if c.enforcement_literal),
+    }
+
+
+def suggest_solver_params(stats: Dict[str, int], threshold: float = 0.3) -> Dict[str, int]:
+    """
+    Parametri CP-SAT consigliati per un modello misurato con model_stats:
+    con molti vincoli reificati linearizzazione e probing spinti rallentano
+    il presolve senza migliorare il bound.
+
+    :param stats: statistiche restituite da model_stats
+    :param threshold: quota di vincoli reificati oltre la quale intervenire
+    :return: parametri da applicare sopra SOLVER_PARAMETERS (vuoto se nessuno)
+    """
+    total = stats["constraints"]
+    if total == 0 or stats["reified"] / total <= threshold:
+        return {}
+    return {"linearization_level": 1, "cp_model_probing_level": 1}
+
+def get_or_build_free_weekend_vars(
+        model: cp_model.CpModel,
+        nurse_shift,
+        num_nurses: int,
+        num_days: int,
+        start_weekday: int = 0,
+) -> Tuple[List[Tuple[int, int]], Dict[Tuple[int, int], cp_model.IntVar]]:
+    """
+    Restituisce le coppie (sabato, domenica) del periodo e le BoolVar
+    {(nurse_idx, weekend_idx): libero}, condivise da hc_weekend_rest_monthly
+    e sc_weekend_rest tramite il ModelContext (create una sola volta per modello).
+
+    :param model: modello CP-SAT
+    :param nurse_shift: variabili decisionali
+    :param num_nurses: numero di infermieri
+    :param num_days: giorni del periodo
+    :param start_weekday: giorno della settimana del primo giorno (0=lunedì)
+    :return: (weekend_pairs, free_vars)
+    """
+    ctx = get_model_context(model, nurse_shift, num_nurses, num_days)
+    return ctx.weekend_pairs(start_weekday), ctx.free_weekend_vars(start_weekday)
+
+def period_hours_factor(num_days: int) -> float:
+    """
+    Frazione delle ore contrattuali mensili disponibile nel periodo.
+
+    :param num_days: giorni del periodo
+    :return: 1/4 per una settimana, 1.0 per un mese, num_days/30 altrimenti
+    """
+    # FIX: Per i mesi usa direttamente le ore mensili
+    if num_days == 7:
+        return 1 / 4  # Settimana: ore mensili / 4
+    if 28 <= num_days <= 31:
+        return 1.0  # Mese: usa ore mensili direttamente
+    return num_days / 30.0  # Periodo custom
+
+
+def compute_nurse_bounds(
+        nurses: List[Nurse],
+        num_days: int,
+        tol: float,
+        daily_shifts: int,
+) -> List[Tuple[int, int]]:
+    """
+    Calcola per ogni infermiere il numero minimo e massimo di turni lavorativi
+    nel periodo, in proporzione alle ore contrattuali.
+
+    :param nurses: lista infermieri
+    :param num_days: giorni del periodo
+    :param tol: tolleranza rispetto alla quota ideale (es. 0.25)
+    :param daily_shifts: turni lavorativi da coprire ogni giorno
+    :return: lista di tuple (min_turni, max_turni), nello stesso ordine di nurses
+    """
+    factor = period_hours_factor(num_days)
+    hours = [n.contracted_hours * factor for n in nurses]
+    total_h = sum(hours)
+    req = daily_shifts * num_days
+
+    bounds = []
+    for h in hours:
+        ideal = (h / total_h) * req if total_h > 0 else 0
+        min_s = max(0, int(ideal * (1 - tol)))
+        max_s = min(int(ideal * (1 + tol)) + 1, int(h / 8))
+        bounds.append((min_s, max_s))
+    return bounds
+
+
+def max_nights_limit(max_monthly: int, num_days: int) -> int:
+    """
+    Notti massime per infermiere nel periodo, riscalando il limite mensile.
+
+    :param max_monthly: notti massime in un mese
+    :param num_days: giorni del periodo
+    :return: limite per il periodo
+    """
+    if num_days == 7:
+        return min(2, max_monthly // 4 + 1)
+    if num_days >= 28:
+        return max_monthly
+    return max(1, int(max_monthly * num_days / 30.0))
+
+def referenced_nurses(constraints: List[Dict], nurses: List[Nurse]) -> Set[str]:
+    """
+    Nomi degli infermieri citati nei params dei vincoli, per nome
+    (nurse, pairs) o per indice (nurse_idx, assignments, original_plan_hints).
+
+    :param constraints: vincoli hard e/o soft nel formato dei loader
+    :param nurses: lista infermieri, per tradurre gli indici in nomi
+    :return: insieme dei nomi citati
+    """
+    names: Set[str] = set()
+    indices: List[int] = []
+    for c in constraints:
+        params = c.get("params", {})
+        if "nurse" in params:
+            names.add(params["nurse"])
+        for pair in params.get("pairs", []):
+            names.update(pair)
+        if "nurse_idx" in params:
+            indices.append(params["nurse_idx"])
+        indices.extend(a[0] for a in params.get("assignments", []))
+        indices.extend(key[0] for key in params.get("original_plan_hints", {}))
+    names.update(nurses[i].name for i in indices if 0 <= i < len(nurses))
+    return names
+
 # -----------------------------
 # HARD CONSTRAINTS
 # -----------------------------
@@ -65,15 +208,19 @@ def hc_coverage_min(
 ):
     """Numero minimo di infermieri per turno"""
     required = {
-        ShiftType.MORNING: params.get("morning", 2),
-        ShiftType.AFTERNOON: params.get("afternoon", 2),
-        ShiftType.NIGHT: params.get("night", 1),
+        M: params.get("morning", 2),
+        A: params.get("afternoon", 2),
+        N: params.get("night", 1),
     }
-    for d in range(num_days):
-        for shift, req in required.items():
-            model.Add(
-                sum(nurse_shift[i, d, shift.value] for i in range(len(nurses))) >= req
-            )
+    num_nurses = len(nurses)
+    grid = get_model_context(model, nurse_shift, num_nurses, num_days).grid
+    # Scritti in blocco nel proto: la somma non supera mai num_nurses,
+    # quindi [req, max(req, num_nurses)] equivale a ">= req"
+    add_sum_constraints(model, (
+        ([days[d][sv] for days in grid], req, max(req, num_nurses))
+        for d in range(num_days)
+        for sv, req in required.items()
+    ))
 
 @registry.hard_constraint("incompatibility")
 def hc_incompatibility(
@@ -84,14 +231,16 @@ def hc_incompatibility(
     num_days: int
 ):
     """Coppie di infermieri non possono lavorare lo stesso turno"""
-    name_to_id = {n.name: i for i, n in enumerate(nurses)}
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    name_to_id, grid = ctx.name_to_id(nurses), ctx.grid
     for n1, n2 in params.get("pairs", []):
-        i1, i2 = name_to_id[n1], name_to_id[n2]
-        for d in range(num_days):
-            for shift in ShiftType:
-                model.Add(
-                    nurse_shift[i1, d, shift.value] + nurse_shift[i2, d, shift.value] <= 1
-                )
+        days1, days2 = grid[name_to_id[n1]], grid[name_to_id[n2]]
+        # x + y <= 1 come AtMostOne: clausola SAT nativa invece di vincolo lineare
+        add_at_most_one_constraints(model, (
+            (day1[sv], day2[sv])
+            for day1, day2 in zip(days1, days2)
+            for sv in ALL_SHIFT_VALS
+        ))
 
 @registry.hard_constraint("max_consecutive_nights")
 def hc_max_consec_nights(
@@ -101,16 +250,24 @@ def hc_max_consec_nights(
     params,
     num_days: int
 ):
-    """Limita il numero di notti consecutive"""
+    """
+    Limita il numero di notti consecutive.
+    Opzionale: max_per_week limita le notti in ogni finestra di 7 giorni.
+    """
     max_n = int(params.get("max", 3))
+    max_per_week = params.get("max_per_week")
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
+        nights = ctx.shift_row(i, N)
+        # Negazioni create una volta per giorno, non una volta per finestra
+        no_nights = [night.Not() for night in nights]
+        # Clausola "almeno una delle max_n+1 notti è libera": propagata dal
+        # nucleo SAT invece che come somma lineare <= max_n
         for d in range(num_days - max_n):
-            model.Add(
-                sum(
-                    nurse_shift[i, d + k, ShiftType.NIGHT.value]
-                    for k in range(max_n + 1)
-                ) <= max_n
-            )
+            model.AddBoolOr(no_nights[d:d + max_n + 1])
+        if max_per_week is not None:
+            for d in range(num_days - 6):
+                model.Add(cp_model.LinearExpr.Sum(nights[d:d + 7]) <= int(max_per_week))
 
 @registry.hard_constraint("max_consecutive_work_days")
 def hc_max_consec_days(
@@ -122,15 +279,15 @@ def hc_max_consec_days(
 ):
     """Limita i giorni lavorativi consecutivi"""
     max_d = int(params.get("max_days", 6))
+    grid = get_model_context(model, nurse_shift, len(nurses), num_days).grid
     for i in range(len(nurses)):
+        days = grid[i]
+        # Somma lineare dei turni della finestra: la clausola sui giorni
+        # "assigned" è equivalente ma peggiora la ricerca del solver
         for d in range(num_days - max_d):
-            model.Add(
-                sum(
-                    nurse_shift[i, d + k, s.value]
-                    for k in range(max_d + 1)
-                    for s in ShiftType
-                ) <= max_d
-            )
+            model.Add(cp_model.LinearExpr.Sum([
+                var for day in days[d:d + max_d + 1] for var in day
+            ]) <= max_d)
 
 @registry.hard_constraint("min_rest_hours")
 def hc_min_rest(
@@ -144,12 +301,13 @@ def hc_min_rest(
     hours = int(params.get("hours", 11))
     if hours < 11:
         return
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
-        for d in range(num_days - 1):
-            model.Add(
-                nurse_shift[i, d, ShiftType.NIGHT.value] +
-                nurse_shift[i, d + 1, ShiftType.MORNING.value] <= 1
-            )
+        nights, mornings = ctx.shift_row(i, N), ctx.shift_row(i, M)
+        # notte[d] + mattina[d+1] <= 1 senza costruire espressioni lineari
+        add_at_most_one_constraints(model, (
+            (nights[d], mornings[d + 1]) for d in range(num_days - 1)
+        ))
 
 @registry.hard_constraint("no_pm_to_m_transition")
 def hc_no_pm_to_m_transition(
@@ -160,11 +318,12 @@ def hc_no_pm_to_m_transition(
     num_days: int
 ):
     """Impedisce Pomeriggio->Mattina giorno successivo"""
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
-        for d in range(num_days - 1):
-            p = nurse_shift[i, d, ShiftType.AFTERNOON.value]
-            m = nurse_shift[i, d + 1, ShiftType.MORNING.value]
-            model.Add(p + m <= 1)
+        afternoons, mornings = ctx.shift_row(i, A), ctx.shift_row(i, M)
+        add_at_most_one_constraints(model, (
+            (afternoons[d], mornings[d + 1]) for d in range(num_days - 1)
+        ))
 
 @registry.hard_constraint("no_afternoon_after_morning")
 def hc_no_afternoon_after_morning(
@@ -175,12 +334,9 @@ def hc_no_afternoon_after_morning(
     num_days: int
 ):
     """Non permette Mattina+Pomeriggio nello stesso giorno"""
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
-        for d in range(num_days):
-            model.Add(
-                nurse_shift[i, d, ShiftType.MORNING.value] +
-                nurse_shift[i, d, ShiftType.AFTERNOON.value] <= 1
-            )
+        add_at_most_one_constraints(model, zip(ctx.shift_row(i, M), ctx.shift_row(i, A)))
 
 @registry.hard_constraint("mandatory_smonto_after_night")
 def hc_mandatory_smonto_after_night(
@@ -191,12 +347,12 @@ def hc_mandatory_smonto_after_night(
     num_days: int
 ):
     """Assicura smonto dopo ogni notte"""
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
+        nights, smonto = ctx.shift_row(i, N), ctx.shift_row(i, SM)
         for d in range(num_days - 1):
-            model.Add(
-                nurse_shift[i, d, ShiftType.NIGHT.value] <=
-                nurse_shift[i, d + 1, ShiftType.SMONTO.value]
-            )
+            # notte[d] -> smonto[d+1]: arco del grafo di implicazioni SAT
+            model.AddImplication(nights[d], smonto[d + 1])
 
 @registry.hard_constraint("mandatory_rest_after_smonto")
 def hc_mandatory_rest_after_smonto(
@@ -207,13 +363,64 @@ def hc_mandatory_rest_after_smonto(
     num_days: int
 ):
     """Riposo obbligatorio dopo smonto"""
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
         for d in range(num_days - 1):
-            for s in ShiftType:
-                model.Add(
-                    nurse_shift[i, d, ShiftType.SMONTO.value] +
-                    nurse_shift[i, d + 1, s.value] <= 1
-                )
+            # assigned[d+1] copre tutti i turni (SMONTO compreso): una sola
+            # implicazione al giorno, che il presolve concatena nel grafo booleano
+            model.AddImplication(nurse_shift[i, d, SM], ctx.assigned(i, d + 1).Not())
+
+@registry.hard_constraint("shift_transitions")
+def hc_shift_transitions(
+    model: cp_model.CpModel,
+    nurse_shift,
+    nurses: List[Nurse],
+    params,
+    num_days: int
+):
+    """
+    Regole di transizione tra giorni consecutivi come un unico automa per
+    infermiere (AddAutomaton), in alternativa ai vincoli a coppie
+    no_pm_to_m_transition, mandatory_smonto_after_night e
+    mandatory_rest_after_smonto. Ogni regola si può disattivare dai params.
+    """
+    no_pm_to_m = params.get("no_pm_to_m", True)
+    smonto_after_night = params.get("smonto_after_night", True)
+    rest_after_smonto = params.get("rest_after_smonto", True)
+    if num_days == 0:
+        return
+
+    rest = len(ALL_SHIFT_VALS)  # simbolo "nessun turno"
+    start = rest + 1            # stato iniziale: nessun vincolo sul giorno precedente
+
+    def allowed(prev: int, cur: int) -> bool:
+        if no_pm_to_m and prev == A and cur == M:
+            return False
+        if smonto_after_night and prev == N and cur != SM:
+            return False
+        if rest_after_smonto and prev == SM and cur != rest:
+            return False
+        return True
+
+    # Lo stato è il simbolo dell'ultimo giorno: tutti gli stati sono finali
+    symbols = ALL_SHIFT_VALS + (rest,)
+    transitions = [(start, cur, cur) for cur in symbols]
+    transitions += [(prev, cur, cur) for prev in symbols for cur in symbols if allowed(prev, cur)]
+
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    for i in range(len(nurses)):
+        day_symbols = []
+        for d in range(num_days):
+            sym = model.NewIntVar(0, rest, f"n{i}_d{d}_symbol")
+            # Al più un turno al giorno: simbolo = valore del turno, oppure rest
+            model.Add(
+                sym == cp_model.LinearExpr.WeightedSum(
+                    ctx.grid[i][d] + [ctx.assigned(i, d)],
+                    list(ALL_SHIFT_VALS) + [-rest],
+                ) + rest
+            )
+            day_symbols.append(sym)
+        model.AddAutomaton(day_symbols, start, list(symbols), transitions)
 
 @registry.hard_constraint("shift_balance_morning_afternoon")
 def hc_shift_balance_morning_afternoon(
@@ -227,11 +434,16 @@ def hc_shift_balance_morning_afternoon(
     max_disc = params.get("max_discrepancy", 0.65)
     factor = int(max_disc * 100)
     inv = 100 - factor
+    # Stesso vincolo con coefficienti ridotti (es. 65/35 -> 13/7)
+    g = gcd(factor, inv) or 1
+    factor, inv = factor // g, inv // g
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
-        m_cnt = sum(nurse_shift[i, d, ShiftType.MORNING.value] for d in range(num_days))
-        p_cnt = sum(nurse_shift[i, d, ShiftType.AFTERNOON.value] for d in range(num_days))
-        model.Add(m_cnt * inv <= p_cnt * factor)
-        model.Add(p_cnt * inv <= m_cnt * factor)
+        m_cnt = cp_model.LinearExpr.Sum(ctx.shift_row(i, M))
+        p_cnt = cp_model.LinearExpr.Sum(ctx.shift_row(i, A))
+        # m*inv <= p*factor e p*inv <= m*factor, come singole somme pesate
+        model.Add(cp_model.LinearExpr.WeightedSum([m_cnt, p_cnt], [inv, -factor]) <= 0)
+        model.Add(cp_model.LinearExpr.WeightedSum([p_cnt, m_cnt], [inv, -factor]) <= 0)
 
 @registry.hard_constraint("workload_balance_hard")
 def hc_workload_balance_hard(
@@ -244,31 +456,15 @@ def hc_workload_balance_hard(
     """Bilanciamento HARD del carico di lavoro"""
     tol = params.get("tolerance", 0.25)
     daily = params.get("daily_shifts", 5)
+    bounds = compute_nurse_bounds(nurses, num_days, tol, daily)
+    grid = get_model_context(model, nurse_shift, len(nurses), num_days).grid
 
-    # FIX: Per i mesi usa direttamente le ore mensili
-    if num_days == 7:
-        factor = 1 / 4  # Settimana: ore mensili / 4
-    elif num_days >= 28 and num_days <= 31:
-        factor = 1.0  # Mese: usa ore mensili direttamente
-    else:
-        factor = num_days / 30.0  # Periodo custom
-
-    total_h = sum(n.contracted_hours * factor for n in nurses)
-    req = daily * num_days
-
-    for i, n in enumerate(nurses):
-        h = n.contracted_hours * factor
-        ideal = (h / total_h) * req if total_h > 0 else 0
-        min_s = max(0, int(ideal * (1 - tol)))
-        max_s = min(int(ideal * (1 + tol)) + 1, int(h / 8))
-
-        total_w = sum(
-            nurse_shift[i, d, s.value]
-            for d in range(num_days)
-            for s in [ShiftType.MORNING, ShiftType.AFTERNOON, ShiftType.NIGHT]
-        )
-        model.Add(total_w >= min_s)
-        model.Add(total_w <= max_s)
+    for i, (min_s, max_s) in enumerate(bounds):
+        # Un solo vincolo min_s <= turni <= max_s, direttamente sui turni M/P/N:
+        # passare per total_working (somma di "worked") peggiora la ricerca
+        model.AddLinearConstraint(cp_model.LinearExpr.Sum([
+            day[sv] for day in grid[i] for sv in WORKING_SHIFT_VALS
+        ]), min_s, max_s)
 
 @registry.hard_constraint("max_nights_per_month")
 def hc_max_nights_per_month(
@@ -279,17 +475,49 @@ def hc_max_nights_per_month(
     num_days: int
 ):
     """Massimo turni notturni nel periodo"""
-    max_m = params.get("max_monthly", 4)
-    if num_days == 7:
-        lim = min(2, max_m // 4 + 1)
-    elif num_days >= 28:
-        lim = max_m
-    else:
-        lim = max(1, int(max_m * num_days / 30.0))
+    lim = max_nights_limit(params.get("max_monthly", 4), num_days)
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
     for i in range(len(nurses)):
-        tot_n = sum(nurse_shift[i, d, ShiftType.NIGHT.value] for d in range(num_days))
+        tot_n = cp_model.LinearExpr.Sum(ctx.shift_row(i, N))
         model.Add(tot_n <= lim)
 
+@registry.hard_constraint("weekly_redundant")
+def hc_weekly_redundant(
+        model: cp_model.CpModel,
+        nurse_shift,
+        nurses: List[Nurse],
+        params,
+        num_days: int,
+        start_weekday: int = 0
+):
+    """
+    Vincoli aggregati per settimana di calendario (lunedì-domenica).
+    La copertura settimanale deriva da daily_minimum ({shift_value: minimo}),
+    che lo Scheduler ricava dalla copertura giornaliera attiva: è quindi
+    implicata da quella e serve solo a dare al solver (rilassamento LP e
+    propagazione) limiti più stretti.
+    Opzionale: max_days_per_week limita i giorni lavorati da ogni infermiere
+    in ogni settimana (questo invece è un vincolo aggiuntivo).
+    """
+    required = params.get("daily_minimum", {})
+    max_days = params.get("max_days_per_week")
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+
+    first_monday = (7 - start_weekday) % 7
+    for monday in range(first_monday, num_days - 6, 7):
+        week = range(monday, monday + 7)
+        for sv, req in required.items():
+            if req <= 0:
+                continue
+            model.Add(
+                cp_model.LinearExpr.Sum(
+                    [days[d][sv] for days in ctx.grid for d in week]
+                ) >= req * 7
+            )
+        if max_days is not None:
+            for i in range(len(nurses)):
+                model.Add(cp_model.LinearExpr.Sum([ctx.worked(i, d) for d in week]) <= int(max_days))
+
 
 @registry.hard_constraint("weekend_rest_monthly")
 def hc_weekend_rest_monthly(
@@ -305,41 +533,57 @@ def hc_weekend_rest_monthly(
     Ora usa il calendario reale per identificare i weekend.
     """
     free_req = int(params.get("free_weekends", 2))
+    if free_req <= 0:
+        # sum(flag) >= 0 è sempre vero: nessuna variabile da creare
+        return
 
-    # Trova weekend veri
-    weekend_pairs = []
-    for day in range(num_days - 1):
-        weekday = (start_weekday + day) % 7
-        next_weekday = (start_weekday + day + 1) % 7
-
-        if weekday == 5 and next_weekday == 6:  # Sabato + Domenica
-            weekend_pairs.append((day, day + 1))
-
-    if len(weekend_pairs) < free_req:
+    # Primo passo senza creare variabili: bastano i weekend del periodo?
+    if len(weekend_pairs(num_days, start_weekday)) < free_req:
         # Non ci sono abbastanza weekend nel periodo per soddisfare il vincolo
         return
 
-    for i in range(len(nurses)):
-        free_weekend_flags = []
-
-        for w_idx, (saturday, sunday) in enumerate(weekend_pairs):
-            # Variabile: questo weekend è libero?
-            weekend_free = model.NewBoolVar(f"n{i}_w{w_idx}_free")
-
-            # Conta turni nel weekend
-            saturday_shifts = sum(nurse_shift[i, saturday, s.value] for s in ShiftType)
-            sunday_shifts = sum(nurse_shift[i, sunday, s.value] for s in ShiftType)
-            total_shifts = saturday_shifts + sunday_shifts
+    pairs, free_vars = get_or_build_free_weekend_vars(
+        model, nurse_shift, len(nurses), num_days, start_weekday
+    )
 
-            # Weekend libero solo se nessun turno
-            model.Add(total_shifts == 0).OnlyEnforceIf(weekend_free)
-            model.Add(total_shifts > 0).OnlyEnforceIf(weekend_free.Not())
-
-            free_weekend_flags.append(weekend_free)
+    for i in range(len(nurses)):
+        free_weekend_flags = [free_vars[i, w_idx] for w_idx in range(len(pairs))]
 
         # Almeno free_req weekend liberi
         if free_weekend_flags:
-            model.Add(sum(free_weekend_flags) >= free_req)
+            model.Add(cp_model.LinearExpr.Sum(free_weekend_flags) >= free_req)
+
+@registry.hard_constraint("symmetry_breaking")
+def hc_symmetry_breaking(
+    model: cp_model.CpModel,
+    nurse_shift,
+    nurses: List[Nurse],
+    params,
+    num_days: int
+):
+    """
+    Rompe la simmetria tra infermieri intercambiabili (stesse ore contrattuali
+    e stesse preferenze): all'interno di ogni gruppo i giorni lavorati sono
+    non crescenti nell'ordine della lista, così il solver non esplora le
+    permutazioni equivalenti della stessa soluzione.
+
+    Valido solo se nessun altro vincolo distingue gli infermieri del gruppo:
+    lo Scheduler aggiunge a params["exclude"] chi compare in vincoli
+    nominativi (vedi referenced_nurses); chi chiama l'handler direttamente
+    deve elencarli da sé.
+    """
+    excluded = set(params.get("exclude", []))
+    groups: Dict[tuple, List[int]] = {}
+    for i, n in enumerate(nurses):
+        if n.name in excluded:
+            continue
+        key = (n.contracted_hours, repr(sorted(n.preferences.items())))
+        groups.setdefault(key, []).append(i)
+
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    for members in groups.values():
+        for i, j in zip(members, members[1:]):
+            model.Add(ctx.total_working(i) >= ctx.total_working(j))
 
 # -----------------------------
 # SOFT CONSTRAINTS
@@ -354,9 +598,10 @@ def sc_prefer_shift(
     num_days: int,
     weight: int
 ) -> List[SoftTerm]:
-    idx = {n.name: i for i, n in enumerate(nurses)}[params["nurse"]]
-    stype = ShiftType(params["shift"]).value
-    return [SoftTerm(nurse_shift[idx, d, stype], weight) for d in range(num_days)]
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    idx = ctx.name_to_id(nurses)[params["nurse"]]
+    row = ctx.shift_row(idx, ShiftType(params["shift"]).value)
+    return [SoftTerm(var, weight) for var in row]
 
 
 """
@@ -386,68 +631,48 @@ def sc_weekend_rest(
     """
     terms = []
 
-    # Trova tutti i weekend veri nel periodo
-    weekend_pairs = []
-    for day in range(num_days - 1):
-        weekday = (start_weekday + day) % 7
-        next_weekday = (start_weekday + day + 1) % 7
+    # Weekend del periodo e variabili "libero" condivise con il vincolo hard
+    pairs, free_vars = get_or_build_free_weekend_vars(
+        model, nurse_shift, len(nurses), num_days, start_weekday
+    )
 
-        if weekday == 5 and next_weekday == 6:
-            weekend_pairs.append((day, day + 1))
-
-    if not weekend_pairs:
+    if not pairs:
         return terms
 
     for i in range(len(nurses)):
         # Lista di variabili boolean: ogni weekend è libero?
-        free_weekends = []
-
-        for weekend_idx, (saturday, sunday) in enumerate(weekend_pairs):
-            weekend_free = model.NewBoolVar(f"nurse{i}_weekend{weekend_idx}_free")
-
-            # Conta turni nel weekend
-            saturday_shifts = sum(nurse_shift[i, saturday, s.value] for s in ShiftType)
-            sunday_shifts = sum(nurse_shift[i, sunday, s.value] for s in ShiftType)
-            total_weekend_shifts = saturday_shifts + sunday_shifts
-
-            # Il weekend è libero solo se non ci sono turni
-            model.Add(total_weekend_shifts == 0).OnlyEnforceIf(weekend_free)
-            model.Add(total_weekend_shifts > 0).OnlyEnforceIf(weekend_free.Not())
-
-            free_weekends.append(weekend_free)
+        free_weekends = [free_vars[i, w_idx] for w_idx in range(len(pairs))]
 
         if not free_weekends:
             continue
 
         # STRATEGIA EQUA: Pesi decrescenti per incentivare distribuzione equa
-
         # 1. PRIORITÀ MASSIMA: Almeno 1 weekend libero (peso x3)
-        if len(weekend_pairs) >= 1:
-            has_1_free = model.NewBoolVar(f"nurse{i}_has_1_weekend")
-            model.Add(sum(free_weekends) >= 1).OnlyEnforceIf(has_1_free)
-            model.Add(sum(free_weekends) == 0).OnlyEnforceIf(has_1_free.Not())
-            terms.append(SoftTerm(has_1_free, weight * 3))  # PESO TRIPLICATO
-
         # 2. PRIORITÀ MEDIA: Secondo weekend libero (peso normale)
-        if len(weekend_pairs) >= 2:
-            has_2_free = model.NewBoolVar(f"nurse{i}_has_2_weekends")
-            model.Add(sum(free_weekends) >= 2).OnlyEnforceIf(has_2_free)
-            model.Add(sum(free_weekends) <= 1).OnlyEnforceIf(has_2_free.Not())
-            terms.append(SoftTerm(has_2_free, weight))  # PESO NORMALE
-
         # 3. BONUS BASSO: Terzo weekend libero (peso ridotto)
-        if len(weekend_pairs) >= 3:
-            has_3_free = model.NewBoolVar(f"nurse{i}_has_3_weekends")
-            model.Add(sum(free_weekends) >= 3).OnlyEnforceIf(has_3_free)
-            model.Add(sum(free_weekends) <= 2).OnlyEnforceIf(has_3_free.Not())
-            terms.append(SoftTerm(has_3_free, weight // 3))  # PESO RIDOTTO
-
         # 4. EXTRA: Quarto weekend se disponibile (bonus minimo)
-        if len(weekend_pairs) >= 4:
-            has_4_free = model.NewBoolVar(f"nurse{i}_has_4_weekends")
-            model.Add(sum(free_weekends) >= 4).OnlyEnforceIf(has_4_free)
-            model.Add(sum(free_weekends) <= 3).OnlyEnforceIf(has_4_free.Not())
-            terms.append(SoftTerm(has_4_free, weight // 6))  # PESO MINIMO
+        tiers = ((1, weight * 3), (2, weight), (3, weight // 3), (4, weight // 6))
+        total_free = cp_model.LinearExpr.Sum(free_weekends)
+
+        for k, tier_weight in tiers:
+            if k > len(pairs) or tier_weight == 0:
+                continue
+            has_k_free = model.NewBoolVar(f"nurse{i}_has_{k}_weekends")
+            # L'obiettivo è massimizzato: basta un verso dell'equivalenza.
+            # Con un premio il solver accende has_k appena può, con una
+            # penalità lo spegne appena può
+            if k == 1:
+                # "Almeno un weekend libero" è una disgiunzione: clausola pura
+                if tier_weight > 0:
+                    model.AddBoolOr(free_weekends).OnlyEnforceIf(has_k_free)
+                else:
+                    for free in free_weekends:
+                        model.AddImplication(free, has_k_free)
+            elif tier_weight > 0:
+                model.Add(total_free >= k).OnlyEnforceIf(has_k_free)
+            else:
+                model.Add(total_free <= k - 1).OnlyEnforceIf(has_k_free.Not())
+            terms.append(SoftTerm(has_k_free, tier_weight))
 
     return terms
 
@@ -471,83 +696,63 @@ def sc_shift_blocks(
     Parametri:
     - min_block_size: dimensione minima blocco per ottenere premio (default 2)
     - bonus_block_size: dimensione blocco che ottiene bonus extra (default 3)
+
+    Una BoolVar per ogni blocco (inizio, lunghezza) con premio non nullo:
+    i due bonus della stessa lunghezza sono sommati in block_weight(L).
     """
     terms = []
     
     min_block_size = params.get("min_block_size", 2)
     bonus_block_size = params.get("bonus_block_size", 3)
-    
+    if num_days < min_block_size:
+        return terms
+
+    def block_weight(size: int) -> int:
+        """Premio totale per un blocco di esattamente `size` giorni."""
+        total = 0
+        if min_block_size <= size <= bonus_block_size:
+            # Bonus extra per blocchi della dimensione preferita
+            total += weight * 2 if size == bonus_block_size else weight
+        if size in (4, 5):
+            # Bonus decrescente per blocchi lunghi (evitare affaticamento)
+            total += weight * 3 // size
+        return total
+
+    sizes = [
+        (size, block_weight(size))
+        for size in range(1, max(bonus_block_size, 5) + 1)
+        if block_weight(size)
+    ]
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+
     # Solo turni lavorativi (escludiamo SMONTO e RIPOSO dai blocchi)
-    working_shifts = [ShiftType.MORNING, ShiftType.AFTERNOON, ShiftType.NIGHT]
-    
     for i in range(len(nurses)):
-        for shift_type in working_shifts:
-            shift_val = shift_type.value
-            
-            # Trova blocchi consecutivi di questo tipo di turno
+        for shift_val in WORKING_SHIFT_VALS:
+            label = f"nurse{i}_block_{ShiftType(shift_val).name.lower()}"
+            x = ctx.shift_row(i, shift_val)
+
             for start_day in range(num_days - min_block_size + 1):
-                
-                # Blocco di dimensione minima (2-3 giorni)
-                for block_size in range(min_block_size, min(bonus_block_size + 1, num_days - start_day + 1)):
-                    
-                    # Variabile: esiste un blocco di questa dimensione che inizia in start_day?
-                    block_var = model.NewBoolVar(f"nurse{i}_block_{shift_type.name.lower()}_{start_day}_{block_size}")
-                    
-                    # Condizioni per il blocco:
-                    block_conditions = []
-                    
-                    # 1. Tutti i giorni del blocco devono avere questo turno
-                    for day_offset in range(block_size):
-                        day = start_day + day_offset
-                        block_conditions.append(nurse_shift[i, day, shift_val])
-                    
-                    # 2. Il giorno prima del blocco (se esiste) NON deve avere questo turno
+                for block_size, block_w in sizes:
+                    end_day = start_day + block_size
+                    if end_day > num_days:
+                        break
+
+                    # Tutti i giorni del blocco con questo turno, il giorno prima e
+                    # quello dopo (se esistono) senza
+                    block_conditions = x[start_day:end_day]
                     if start_day > 0:
-                        block_conditions.append(nurse_shift[i, start_day - 1, shift_val].Not())
-                    
-                    # 3. Il giorno dopo il blocco (se esiste) NON deve avere questo turno
-                    if start_day + block_size < num_days:
-                        block_conditions.append(nurse_shift[i, start_day + block_size, shift_val].Not())
-                    
-                    # Il blocco esiste solo se tutte le condizioni sono vere
+                        block_conditions.append(x[start_day - 1].Not())
+                    if end_day < num_days:
+                        block_conditions.append(x[end_day].Not())
+
+                    block_var = model.NewBoolVar(f"{label}_{start_day}_{block_size}")
+                    # Con premio positivo il solver porta block_var a 1 ogni volta
+                    # che può: basta block_var => blocco. Il verso opposto serve
+                    # solo se un peso negativo rende il blocco una penalità
                     model.AddBoolAnd(block_conditions).OnlyEnforceIf(block_var)
-                    model.AddBoolOr([cond.Not() for cond in block_conditions]).OnlyEnforceIf(block_var.Not())
-                    
-                    # Premio proporzionale alla dimensione del blocco
-                    if block_size == bonus_block_size:
-                        # Bonus extra per blocchi della dimensione preferita
-                        block_weight = weight * 2
-                    else:
-                        # Premio normale per blocchi di dimensione minima
-                        block_weight = weight
-                    
-                    terms.append(SoftTerm(block_var, block_weight))
-                
-                # Bonus speciale per blocchi molto lunghi (4+ giorni)
-                if num_days - start_day >= 4:
-                    for long_block_size in range(4, min(6, num_days - start_day + 1)):  # Max 5 giorni consecutivi
-                        
-                        long_block_var = model.NewBoolVar(f"nurse{i}_long_block_{shift_type.name.lower()}_{start_day}_{long_block_size}")
-                        
-                        long_conditions = []
-                        
-                        # Tutti i giorni del blocco lungo devono avere questo turno
-                        for day_offset in range(long_block_size):
-                            day = start_day + day_offset
-                            long_conditions.append(nurse_shift[i, day, shift_val])
-                        
-                        # Bordi del blocco
-                        if start_day > 0:
-                            long_conditions.append(nurse_shift[i, start_day - 1, shift_val].Not())
-                        if start_day + long_block_size < num_days:
-                            long_conditions.append(nurse_shift[i, start_day + long_block_size, shift_val].Not())
-                        
-                        model.AddBoolAnd(long_conditions).OnlyEnforceIf(long_block_var)
-                        model.AddBoolOr([cond.Not() for cond in long_conditions]).OnlyEnforceIf(long_block_var.Not())
-                        
-                        # Bonus decrescente per blocchi troppo lunghi (evitare affaticamento)
-                        long_weight = weight * 3 // long_block_size  # Peso decrescente
-                        terms.append(SoftTerm(long_block_var, long_weight))
+                    if block_w < 0:
+                        model.AddBoolOr([cond.Not() for cond in block_conditions]).OnlyEnforceIf(block_var.Not())
+                    terms.append(SoftTerm(block_var, block_w))
     
     return terms
 
@@ -561,17 +766,28 @@ def hc_forced_assignment(
     start_weekday: int = 0
 ):
     """
-    Hard constraint: forza un'assegnazione specifica per supportare modifiche.
+    Hard constraint: forza assegnazioni specifiche per supportare modifiche.
+
+    Accetta una singola assegnazione (nurse_idx, day, shift_type, must_assign)
+    oppure, in blocco, params["assignments"] come lista di tuple
+    (nurse_idx, day, shift_type, must_assign): un solo dispatch dal registry
+    per tutte le celle forzate.
     """
-    nurse_idx = params["nurse_idx"]
-    day = params["day"]
-    shift_type_val = params["shift_type"]
-    must_assign = params.get("must_assign", True)
-    
-    if must_assign:
-        model.Add(nurse_shift[nurse_idx, day, shift_type_val] == 1)
-    else:
-        model.Add(nurse_shift[nurse_idx, day, shift_type_val] == 0)
+    assignments = params.get("assignments")
+    if assignments is None:
+        assignments = [(
+            params["nurse_idx"],
+            params["day"],
+            params["shift_type"],
+            params.get("must_assign", True),
+        )]
+
+    # Si usa model.Add e non la modifica del dominio nel proto: le variabili
+    # decisionali vengono ricopiate da Scheduler._clear_constraints e un
+    # dominio fissato sopravvivrebbe al reset del modello
+    add = model.Add
+    for nurse_idx, day, shift_type_val, must_assign in assignments:
+        add(nurse_shift[nurse_idx, day, shift_type_val] == (1 if must_assign else 0))
 
 @registry.soft_constraint("stability_penalty")
 def sc_stability_penalty(
@@ -588,10 +804,15 @@ def sc_stability_penalty(
     """
     terms = []
     original_hints = params.get("original_plan_hints", {})
-    
+    # Il piano originale fa anche da warm-start: la prima soluzione cercata dal
+    # solver è quella già in uso. Gli hint vanno nel ModelContext e non nel
+    # proto, che Scheduler._solve_model ripulisce a ogni risoluzione
+    ctx_hints = get_model_context(model, nurse_shift, len(nurses), num_days).hints
+
     for (nurse_idx, day, shift_val), original_value in original_hints.items():
         if (nurse_idx, day, shift_val) in nurse_shift:
             var = nurse_shift[nurse_idx, day, shift_val]
+            ctx_hints[nurse_idx, day, shift_val] = original_value
             
             if original_value == 1:
                 # Premio per mantenere assegnazioni esistenti
@@ -614,9 +835,10 @@ def sc_avoid_shift(
     num_days: int,
     weight: int
 ) -> List[SoftTerm]:
-    idx = {n.name: i for i, n in enumerate(nurses)}[params["nurse"]]
-    stype = ShiftType(params["shift"]).value
-    return [SoftTerm(nurse_shift[idx, d, stype], -abs(weight)) for d in range(num_days)]
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    idx = ctx.name_to_id(nurses)[params["nurse"]]
+    row = ctx.shift_row(idx, ShiftType(params["shift"]).value)
+    return [SoftTerm(var, -abs(weight)) for var in row]
 
 @registry.soft_constraint("equity")
 def sc_equity(
@@ -627,26 +849,24 @@ def sc_equity(
     num_days: int,
     weight: int
 ) -> List[SoftTerm]:
-    # Minimizza la varianza nel numero di turni lavorativi (M,P,N)
-    max_shifts = num_days * 3
-    totals: List[cp_model.IntVar] = []
-    for i in range(len(nurses)):
-        t = model.NewIntVar(0, max_shifts, f"tot_{i}")
-        model.Add(
-            t == sum(
-                nurse_shift[i, d, s.value]
-                for d in range(num_days)
-                for s in [ShiftType.MORNING, ShiftType.AFTERNOON, ShiftType.NIGHT]
-            )
-        )
-        totals.append(t)
-    avg = model.NewIntVar(0, max_shifts, "avg")
-    model.AddDivisionEquality(avg, sum(totals), len(nurses))
+    # Minimizza lo scarto nel numero di turni lavorativi (M,P,N) rispetto
+    # alla quota media, calcolata in Python: daily_shifts turni al giorno
+    # divisi tra tutti gli infermieri (niente divisione né valore assoluto nel modello)
+    if not nurses:
+        return []
+    daily = params.get("daily_shifts", 5)
+    target = (daily * num_days) // len(nurses)
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    # Con pochi infermieri il target supera num_days: lo scarto sotto il
+    # target arriva fino a target, non solo a num_days
+    max_dev = max(target, num_days)
     terms: List[SoftTerm] = []
-    for i, t in enumerate(totals):
-        diff = model.NewIntVar(0, max_shifts, f"diff_{i}")
-        model.AddAbsEquality(diff, t - avg)
-        terms.append(SoftTerm(diff, -abs(weight)))
+    for i in range(len(nurses)):
+        over = model.NewIntVar(0, max_dev, f"equity_over_{i}")
+        under = model.NewIntVar(0, max_dev, f"equity_under_{i}")
+        model.Add(ctx.total_working(i) - target == over - under)
+        terms.append(SoftTerm(over, -abs(weight)))
+        terms.append(SoftTerm(under, -abs(weight)))
     return terms
 
 @registry.soft_constraint("workload_balance")
@@ -660,19 +880,18 @@ def sc_workload_balance(
 ) -> List[SoftTerm]:
     # Premi total shifts in base alle ore contrattuali
     factor = (1/4) if num_days == 7 else (num_days / 30.0)
-    total_hours = sum(n.contracted_hours * factor for n in nurses)
-    terms: List[SoftTerm] = []
-    for i, n in enumerate(nurses):
-        nurse_hours = n.contracted_hours * factor
-        proportion = nurse_hours / total_hours if total_hours else 0
-        total_var = model.NewIntVar(0, num_days * 3, f"wb_{i}")
-        model.Add(
-            total_var == sum(
-                nurse_shift[i, d, s.value]
-                for d in range(num_days)
-                for s in [ShiftType.MORNING, ShiftType.AFTERNOON, ShiftType.NIGHT]
-            )
-        )
-        bonus = int(weight * proportion)
-        terms.append(SoftTerm(total_var, bonus))
-    return terms
+    # Premi calcolati in Python in un solo passaggio, prima di toccare il modello
+    nurse_hours = [n.contracted_hours * factor for n in nurses]
+    total_hours = sum(nurse_hours)
+    if not total_hours:
+        return []
+    bonuses = [int(weight * (h / total_hours)) for h in nurse_hours]
+
+    # Il totale per infermiere è la variabile condivisa del ModelContext:
+    # nessuna IntVar/uguaglianza propria e nessun termine a peso zero
+    ctx = get_model_context(model, nurse_shift, len(nurses), num_days)
+    return [
+        SoftTerm(ctx.total_working(i), bonus)
+        for i, bonus in enumerate(bonuses)
+        if bonus
+    ]
@@ -0,0 +1,159 @@
+"""
+model/model_context.py
+----------------------
+Variabili ausiliarie condivise tra i vincoli del registry.
+
+Molti handler ricostruivano le stesse somme (turni lavorati in un giorno,
+turni lavorati nel periodo). ModelContext le materializza una sola volta
+per modello, alla prima richiesta, e le restituisce a tutti gli handler.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+from weakref import WeakKeyDictionary
+
+from ortools.sat.python import cp_model
+
+from utils.date_manager import weekend_pairs
+from utils.enums import WORKING_SHIFT_VALS, ALL_SHIFT_VALS
+
+
+class ModelContext:
+    """Variabili derivate da nurse_shift, create pigramente una volta per modello."""
+
+    def __init__(self, model: cp_model.CpModel, nurse_shift, num_nurses: int, num_days: int):
+        self.model = model
+        self.nurse_shift = nurse_shift
+        self.num_nurses = num_nurses
+        self.num_days = num_days
+        self._worked: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        self._assigned: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        self._total_working: Dict[int, cp_model.IntVar] = {}
+        self._weekend_pairs: Dict[int, List[Tuple[int, int]]] = {}
+        self._free_weekends: Dict[int, Dict[Tuple[int, int], cp_model.IntVar]] = {}
+        self._shift_rows: Dict[Tuple[int, int], List[cp_model.IntVar]] = {}
+        self._grid: List[List[List[cp_model.IntVar]]] | None = None
+        self._name_to_id: Dict[str, int] | None = None
+        # Hint di warm-start {(nurse_idx, day, shift_value): 0/1} registrati dagli
+        # handler: lo Scheduler li unisce a quelli di ogni risoluzione
+        self.hints: Dict[Tuple[int, int, int], int] = {}
+
+    def name_to_id(self, nurses) -> Dict[str, int]:
+        """
+        Indice nome -> posizione dell'infermiere, costruito una volta per
+        modello: ogni modello ha il suo, anche con più sessioni in parallelo.
+
+        :param nurses: lista infermieri con cui è stato creato il modello
+        """
+        if self._name_to_id is None:
+            self._name_to_id = {n.name: i for i, n in enumerate(nurses)}
+        return self._name_to_id
+
+    @property
+    def grid(self) -> List[List[List[cp_model.IntVar]]]:
+        """
+        Le stesse variabili di nurse_shift come liste annidate [i][d][sv]:
+        nei cicli sui giorni si indicizzano liste invece di calcolare l'hash
+        di una tupla (i, d, sv) a ogni accesso. I valori di ShiftType sono
+        0..3 consecutivi, quindi sv è direttamente l'indice.
+        """
+        if self._grid is None:
+            ns = self.nurse_shift
+            self._grid = [
+                [[ns[i, d, sv] for sv in ALL_SHIFT_VALS] for d in range(self.num_days)]
+                for i in range(self.num_nurses)
+            ]
+        return self._grid
+
+    def shift_row(self, i: int, sv: int) -> List[cp_model.IntVar]:
+        """
+        Variabili del turno sv dell'infermiere i, una per giorno: una lista
+        indicizzata per giorno al posto di una ricerca (i, d, sv) nel dict
+        a ogni accesso.
+        """
+        row = self._shift_rows.get((i, sv))
+        if row is None:
+            row = self._shift_rows[i, sv] = [day[sv] for day in self.grid[i]]
+        return row
+
+    def worked(self, i: int, d: int) -> cp_model.IntVar:
+        """BoolVar: l'infermiere i lavora (M, P o N) il giorno d."""
+        var = self._worked.get((i, d))
+        if var is None:
+            var = self.model.NewBoolVar(f"n{i}_d{d}_worked")
+            day = self.grid[i][d]
+            self.model.AddMaxEquality(var, [day[sv] for sv in WORKING_SHIFT_VALS])
+            self._worked[i, d] = var
+        return var
+
+    def assigned(self, i: int, d: int) -> cp_model.IntVar:
+        """BoolVar: l'infermiere i ha un turno qualsiasi (SMONTO compreso) il giorno d."""
+        var = self._assigned.get((i, d))
+        if var is None:
+            var = self.model.NewBoolVar(f"n{i}_d{d}_assigned")
+            self.model.AddMaxEquality(var, list(self.grid[i][d]))
+            self._assigned[i, d] = var
+        return var
+
+    def total_working(self, i: int) -> cp_model.IntVar:
+        """IntVar: giorni lavorati (M, P o N) dall'infermiere i nel periodo."""
+        var = self._total_working.get(i)
+        if var is None:
+            var = self.model.NewIntVar(0, self.num_days, f"n{i}_total_working")
+            self.model.Add(
+                var == cp_model.LinearExpr.Sum([self.worked(i, d) for d in range(self.num_days)])
+            )
+            self._total_working[i] = var
+        return var
+
+    def weekend_pairs(self, start_weekday: int) -> List[Tuple[int, int]]:
+        """Coppie (sabato, domenica) del periodo, calcolate una volta."""
+        pairs = self._weekend_pairs.get(start_weekday)
+        if pairs is None:
+            pairs = self._weekend_pairs[start_weekday] = weekend_pairs(self.num_days, start_weekday)
+        return pairs
+
+    def free_weekend_vars(self, start_weekday: int) -> Dict[Tuple[int, int], cp_model.IntVar]:
+        """BoolVar {(nurse_idx, weekend_idx): weekend libero}, vincolate una sola volta."""
+        free_vars = self._free_weekends.get(start_weekday)
+        if free_vars is not None:
+            return free_vars
+
+        free_vars = {}
+        for i in range(self.num_nurses):
+            for w_idx, (saturday, sunday) in enumerate(self.weekend_pairs(start_weekday)):
+                # Variabile: questo weekend è libero?
+                weekend_free = self.model.NewBoolVar(f"n{i}_w{w_idx}_free")
+
+                worked_days = [self.assigned(i, saturday), self.assigned(i, sunday)]
+
+                # Weekend libero solo se nessun turno: canale booleano puro
+                # (clausole) invece di disuguaglianze lineari reificate
+                self.model.AddBoolAnd([a.Not() for a in worked_days]).OnlyEnforceIf(weekend_free)
+                self.model.AddBoolOr(worked_days).OnlyEnforceIf(weekend_free.Not())
+
+                free_vars[i, w_idx] = weekend_free
+
+        self._free_weekends[start_weekday] = free_vars
+        return free_vars
+
+
+_contexts: "WeakKeyDictionary[cp_model.CpModel, ModelContext]" = WeakKeyDictionary()
+
+
+def get_model_context(model: cp_model.CpModel, nurse_shift, num_nurses: int, num_days: int) -> ModelContext:
+    """
+    Restituisce il ModelContext del modello, creandolo alla prima chiamata.
+
+    :param model: modello CP-SAT
+    :param nurse_shift: variabili decisionali
+    :param num_nurses: numero di infermieri
+    :param num_days: giorni del periodo
+    :return: contesto condiviso da tutti gli handler dello stesso modello
+    """
+    ctx = _contexts.get(model)
+    if ctx is None:
+        ctx = ModelContext(model, nurse_shift, num_nurses, num_days)
+        _contexts[model] = ctx
+    return ctx
@@ -11,10 +11,19 @@ from datetime import datetime
 
 from ortools.sat.python import cp_model
 
-from utils.enums import ShiftType  # 0=morning,1=afternoon,2=night
-from model.constraint_registry import registry, SoftTerm
+from utils.config import SOLVER_PARAMETERS, AUTO_TUNE_SOLVER, REIFIED_DENSITY_THRESHOLD
+from utils.date_manager import weekend_pairs
+from utils.enums import ShiftType, ALL_SHIFT_VALS  # 0=morning,1=afternoon,2=night
+from model.constraint_registry import registry, SoftTerm, model_stats, referenced_nurses, suggest_solver_params
+from model.model_context import get_model_context
 from model.nurse import Nurse
 
+# Tipi di vincolo che ricevono anche start_weekday (lookup O(1) durante il dispatch)
+_HARD_TYPES_WITH_WEEKDAY = frozenset({"weekend_rest_monthly", "forced_assignment", "weekly_redundant"})
+_SOFT_TYPES_WITH_WEEKDAY = frozenset({"weekend_rest", "shift_blocks"})
+# Minimi di coverage_minimum quando un turno non è indicato nei params
+_COVERAGE_DEFAULTS = {ShiftType.MORNING: 2, ShiftType.AFTERNOON: 2, ShiftType.NIGHT: 1}
+
 
 class Scheduler:
     """Industrial‑grade, extensible scheduler con supporto weekend detection"""
@@ -47,7 +56,10 @@ class Scheduler:
 
         self.model = cp_model.CpModel()
         self._build_decision_variables()
+        # Le variabili decisionali sono le prime del proto: _clear_constraints le conserva
+        self._num_decision_vars = len(self.model.Proto().variables)
         self.hints = None  # Storage for warm-start hints
+        self._built = False  # vincoli e obiettivo già aggiunti al modello
 
     # ------------------------------------------------------------------
     # Public API
@@ -60,22 +72,72 @@ class Scheduler:
         """
         self.hints = hints
 
-    def solve(self, max_seconds: float = 60.0) -> Tuple[int, List[Dict]]:
-        """Return (solver status, schedule list)"""
-        self._apply_constraints()
-        self._build_objective()
+    def solve(
+            self,
+            max_seconds: float = 60.0,
+            num_workers: int | None = None,
+            hints: Dict[Tuple[int, int, int], int] | None = None,
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Return (solver status, schedule list).
+        Il modello viene costruito solo alla prima chiamata: le successive
+        (es. con un diverso max_seconds) riusano vincoli e obiettivo.
+
+        :param num_workers: worker paralleli CP-SAT (None = default del solver)
+        :param hints: hint di warm-start solo per questa risoluzione
+            (None = quelli impostati con set_hints)
+        """
+        if not self._built:
+            self._apply_constraints()
+            self._build_objective()
+            self._built = True
+        return self._solve_model(max_seconds, num_workers, hints)
 
+    def _solve_model(
+            self,
+            max_seconds: float,
+            num_workers: int | None = None,
+            hints: Dict[Tuple[int, int, int], int] | None = None,
+    ) -> Tuple[int, List[Dict]]:
+        """Risolve il modello così com'è, senza aggiungere vincoli."""
         solver = cp_model.CpSolver()
+        params = dict(SOLVER_PARAMETERS)
+        if AUTO_TUNE_SOLVER:
+            params.update(suggest_solver_params(model_stats(self.model), REIFIED_DENSITY_THRESHOLD))
+        for name, value in params.items():
+            setattr(solver.parameters, name, value)
         solver.parameters.max_time_in_seconds = max_seconds
-        
-        # Note: OR-Tools hints non disponibili in questa versione
-        # La stabilità è gestita tramite soft constraints
-        
+        if num_workers:
+            solver.parameters.num_search_workers = num_workers
+        if hints is None:
+            hints = self.hints
+        # Hint registrati dai vincoli in costruzione (es. stability_penalty):
+        # quelli passati per questa risoluzione hanno la precedenza
+        ctx_hints = get_model_context(
+            self.model, self.nurse_shift, len(self.nurses), self.num_days
+        ).hints
+        if ctx_hints:
+            hints = {**ctx_hints, **(hints or {})}
+        # Il modello può essere risolto più volte: gli hint di una risoluzione
+        # precedente non devono restare nel proto
+        self.model.ClearHints()
+        if hints:
+            self._apply_hints(hints)
+            # Se l'hint viola qualche vincolo il solver prova a ripararlo
+            solver.parameters.repair_hint = True
+
         status = solver.Solve(self.model)
         if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
             return status, []
         return status, self._extract_schedule(solver)
 
+    def _apply_hints(self, hints: Dict[Tuple[int, int, int], int]) -> None:
+        """Trasferisce gli hint nel modello come solution hint CP-SAT."""
+        for key, value in hints.items():
+            var = self.nurse_shift.get(key)
+            if var is not None:
+                self.model.AddHint(var, value)
+
     # ------------------------------------------------------------------
     # NUOVO: Metodo per identificare weekend
     # ------------------------------------------------------------------
@@ -85,59 +147,108 @@ class Scheduler:
 
         :return: Lista di tuple (indice_sabato, indice_domenica)
         """
-        weekends = []
-
-        for day in range(self.num_days):
-            weekday = (self.start_weekday + day) % 7
-
-            # Se questo giorno è sabato (5) e c'è anche domenica (giorno successivo)
-            if weekday == 5 and day + 1 < self.num_days:
-                next_weekday = (self.start_weekday + day + 1) % 7
-                if next_weekday == 6:  # Domenica
-                    weekends.append((day, day + 1))
-
-        return weekends
+        return weekend_pairs(self.num_days, self.start_weekday)
 
     # ------------------------------------------------------------------
     # Internal helpers (modificati per passare weekend info)
     # ------------------------------------------------------------------
     def _build_decision_variables(self) -> None:
-        self.nurse_shift: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
-        for n_idx in range(len(self.nurses)):
-            for d in range(self.num_days):
-                for s in ShiftType:  # iterate enum
-                    var = self.model.NewBoolVar(f"n{n_idx}_d{d}_s{s.value}")
-                    self.nurse_shift[n_idx, d, s.value] = var
+        new_bool_var = self.model.NewBoolVar
+        self.nurse_shift: Dict[Tuple[int, int, int], cp_model.IntVar] = {
+            (n_idx, d, s.value): new_bool_var(f"n{n_idx}_d{d}_s{s.value}")
+            for n_idx in range(len(self.nurses))
+            for d in range(self.num_days)
+            for s in ShiftType  # iterate enum
+        }
 
     def _apply_constraints(self) -> None:
         """Apply built‑in and registry‑based constraints."""
+        self._apply_builtin_constraints()
+        self._apply_hard_constraints(self.hard_constraints)
+
+    def _clear_constraints(self) -> None:
+        """
+        Riparte da un modello vuoto mantenendo le sole variabili decisionali.
+        Gli IntVar in self.nurse_shift restano validi perché i loro indici
+        nel nuovo proto non cambiano: si evita di ricrearli ad ogni prova.
+        """
+        fresh = cp_model.CpModel()
+        fresh.Proto().variables.extend(
+            self.model.Proto().variables[: self._num_decision_vars]
+        )
+        self.model = fresh
+        self._built = False
+
+    def _apply_builtin_constraints(self) -> None:
+        """Vincoli sempre presenti: un turno al giorno e copertura minima."""
         # Built‑in: one shift per nurse per day (ora include SMONTO)
         for n_idx in range(len(self.nurses)):
             for d in range(self.num_days):
                 self.model.Add(
-                    sum(
-                        self.nurse_shift[n_idx, d, s.value] for s in ShiftType
-                    )
+                    cp_model.LinearExpr.Sum([
+                        self.nurse_shift[n_idx, d, sv] for sv in ALL_SHIFT_VALS
+                    ])
                     <= 1
                 )
         # Built‑in: coverage minimum fallback (overridden by explicit hard constraint)
         self._fallback_coverage_constraints()
 
+    def _apply_hard_constraints(self, hard_constraints: List[Dict[str, Any]]) -> None:
+        """Applica i vincoli hard del registry indicati (anche un sottoinsieme)."""
         # Registry‑driven constraints (ora passano anche weekend info se necessario)
-        for h in self.hard_constraints:
+        for h in hard_constraints:
             c_type = h["type"]
             handler = registry.hard.get(c_type)
             if handler is None:
                 raise ValueError(f"Unknown hard constraint type '{c_type}'")
 
+            if c_type == "symmetry_breaking":
+                h = self._with_referenced_nurses_excluded(h, hard_constraints)
+            elif c_type == "weekly_redundant":
+                h = self._with_daily_minimum(h, hard_constraints)
+
             # Passa parametri standard + weekend info per vincoli che ne hanno bisogno
-            if c_type in ["weekend_rest_monthly", "forced_assignment"]:
+            if c_type in _HARD_TYPES_WITH_WEEKDAY:
                 # Modifica il call per passare info weekend
                 handler(self.model, self.nurse_shift, self.nurses, h["params"],
                         self.num_days, self.start_weekday)
             else:
                 handler(self.model, self.nurse_shift, self.nurses, h["params"], self.num_days)
 
+    def _with_referenced_nurses_excluded(
+            self,
+            constraint: Dict[str, Any],
+            hard_constraints: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Copia di un vincolo symmetry_breaking che esclude anche gli infermieri
+        citati da vincoli nominativi hard o soft: ordinarli romperebbe
+        soluzioni ammissibili o ottime.
+        """
+        constraints = list(hard_constraints) + self.hard_constraints + self.soft_constraints
+        excluded = set(constraint["params"].get("exclude", []))
+        excluded |= referenced_nurses(constraints, self.nurses)
+        return {**constraint, "params": {**constraint["params"], "exclude": sorted(excluded)}}
+
+    def _with_daily_minimum(
+            self,
+            constraint: Dict[str, Any],
+            hard_constraints: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Copia di un vincolo weekly_redundant con la copertura giornaliera
+        effettivamente imposta al modello: il minimo di fallback e quelli dei
+        vincoli coverage_minimum applicati insieme. Solo così i totali
+        settimanali restano implicati da quella giornaliera.
+        """
+        daily_minimum = {shift.value: self.min_coverage[shift] for shift in _COVERAGE_DEFAULTS}
+        for c in hard_constraints:
+            if c["type"] == "coverage_minimum":
+                for shift, default in _COVERAGE_DEFAULTS.items():
+                    req = c["params"].get(shift.name.lower(), default)
+                    daily_minimum[shift.value] = max(daily_minimum[shift.value], req)
+        return {**constraint, "params": {**constraint["params"], "daily_minimum": daily_minimum}}
+
     def _build_objective(self) -> None:
         objective_terms: List[SoftTerm] = []
         for s in self.soft_constraints:
@@ -148,7 +259,7 @@ class Scheduler:
                 raise ValueError(f"Unknown soft constraint type '{c_type}'")
 
             # Passa weekend info ai soft constraints che ne hanno bisogno
-            if c_type in ["weekend_rest", "shift_blocks"]:
+            if c_type in _SOFT_TYPES_WITH_WEEKDAY:
                 terms = handler(
                     self.model,
                     self.nurse_shift,
@@ -170,17 +281,20 @@ class Scheduler:
             if terms:
                 objective_terms.extend(terms)
         if objective_terms:
-            self.model.Maximize(sum(term.expr * term.weight for term in objective_terms))
+            self.model.Maximize(cp_model.LinearExpr.WeightedSum(
+                [term.expr for term in objective_terms],
+                [term.weight for term in objective_terms],
+            ))
 
     # ---------------- private helpers (unchanged) ----------------
     def _fallback_coverage_constraints(self):
         for d in range(self.num_days):
             for shift in ShiftType:
                 self.model.Add(
-                    sum(
+                    cp_model.LinearExpr.Sum([
                         self.nurse_shift[n_idx, d, shift.value]
                         for n_idx in range(len(self.nurses))
-                    )
+                    ])
                     >= self.min_coverage[shift]
                 )
 
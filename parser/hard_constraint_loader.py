@@ -6,10 +6,11 @@ Se il modello non trova alcuna assegnazione che rispetti tutte le hard constrain
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import List, Dict
 
+from parser.json_io import json_cached, read_json
+
 
 # Vincoli supportati in questa versione (AGGIORNATO CON TUTTI I VINCOLI)
 _SUPPORTED_HARD_TYPES: set[str] = {
@@ -25,7 +26,10 @@ _SUPPORTED_HARD_TYPES: set[str] = {
     "no_afternoon_after_morning",
     "max_nights_per_month",
     "weekend_rest_monthly",
-    "shift_balance_morning_afternoon"
+    "shift_balance_morning_afternoon",
+    "weekly_redundant",                  # opzionale: aggregati settimanali ridondanti
+    "symmetry_breaking",                 # opzionale: ordina infermieri intercambiabili
+    "shift_transitions",                 # opzionale: transizioni tra giorni come automa
 }
 
 
@@ -52,6 +56,7 @@ def _validate_hard_constraint(entry: dict, index: int) -> None:
         )
 
 
+@json_cached
 def load_hard_constraints(json_path: str | Path) -> List[Dict]:
     """
     Carica e valida il file JSON dei vincoli rigidi.
@@ -63,8 +68,7 @@ def load_hard_constraints(json_path: str | Path) -> List[Dict]:
     if not path.exists():
         raise FileNotFoundError(f"File non trovato: {path}")
 
-    with path.open(encoding="utf-8") as f:
-        constraints = json.load(f)
+    constraints = read_json(path)
 
     if not isinstance(constraints, list):
         raise ValueError("Il file hard_constraints.json deve contenere una lista di vincoli")
@@ -0,0 +1,73 @@
+"""
+parser/json_io.py
+-----------------
+Lettura dei file JSON di configurazione condivisa dai loader.
+Usa orjson (parser in C) se installato, altrimenti ricade sul modulo json standard.
+I risultati dei loader possono essere memorizzati in un file <nome>.json.pkl
+accanto al JSON, invalidato automaticamente quando il JSON viene modificato.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+try:  # opzionale: decoder C molto più veloce del json standard
+    import orjson
+except ImportError:  # pragma: no cover - dipende dall'ambiente
+    orjson = None
+
+
+T = TypeVar("T")
+
+
+def read_json(path: Path) -> Any:
+    """
+    Legge e decodifica un file JSON in un solo passaggio sui byte.
+
+    :param path: percorso del file JSON
+    :return: oggetto Python decodificato
+    :raises json.JSONDecodeError: se il contenuto non è JSON valido
+        (orjson.JSONDecodeError è una sottoclasse di json.JSONDecodeError)
+    """
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_cached(loader: Callable[[str | Path], T]) -> Callable[[str | Path], T]:
+    """
+    Decoratore per i loader: salva il risultato in <file>.pkl insieme a
+    st_mtime_ns del JSON e lo riusa finché il file non cambia.
+    Errori di lettura/scrittura della cache non sono mai fatali.
+    """
+
+    @functools.wraps(loader)
+    def wrapper(json_path: str | Path) -> T:
+        path = Path(json_path)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            # File mancante: lascia che sia il loader a sollevare l'errore
+            return loader(json_path)
+
+        cache_path = path.with_name(path.name + ".pkl")
+        try:
+            cached_mtime, result = pickle.loads(cache_path.read_bytes())
+            if cached_mtime == mtime:
+                return result
+        except Exception:
+            pass  # cache assente, corrotta o obsoleta
+
+        result = loader(json_path)
+        try:
+            cache_path.write_bytes(pickle.dumps((mtime, result), protocol=5))
+        except OSError:
+            pass  # cartella in sola lettura: si continua senza cache
+        return result
+
+    return wrapper
@@ -7,11 +7,11 @@ Restituisce una lista di oggetti Nurse già pronta per l’uso nel motore di sch
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import List
 
 from model.nurse import Nurse
+from parser.json_io import json_cached, read_json
 
 
 def _validate_nurse_entry(entry: dict, index: int) -> None:
@@ -35,6 +35,7 @@ def _validate_nurse_entry(entry: dict, index: int) -> None:
         )
 
 
+@json_cached
 def load_nurses(json_path: str | Path) -> List[Nurse]:
     """
     Carica e valida il file JSON degli operatori.
@@ -47,8 +48,7 @@ def load_nurses(json_path: str | Path) -> List[Nurse]:
     if not path.exists():
         raise FileNotFoundError(f"File non trovato: {path}")
 
-    with path.open(encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_json(path)
 
     if not isinstance(data, list):
         raise ValueError("Il file nurses.json deve contenere una lista di operatori")
@@ -6,10 +6,11 @@ Aggiunge il nuovo tipo di soft constraint per i weekend.
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import List, Dict
 
+from parser.json_io import json_cached, read_json
+
 
 _SUPPORTED_SOFT_TYPES: set[str] = {
     "prefer_shift",
@@ -49,6 +50,7 @@ def _validate_soft_constraint(entry: dict, index: int) -> None:
         )
 
 
+@json_cached
 def load_soft_constraints(json_path: str | Path) -> List[Dict]:
     """
     Carica e valida il file JSON dei vincoli soft.
@@ -60,8 +62,7 @@ def load_soft_constraints(json_path: str | Path) -> List[Dict]:
     if not path.exists():
         raise FileNotFoundError(f"File non trovato: {path}")
 
-    with path.open(encoding="utf-8") as f:
-        constraints = json.load(f)
+    constraints = read_json(path)
 
     if not isinstance(constraints, list):
         raise ValueError("Il file soft_constraints.json deve contenere una lista di vincoli")
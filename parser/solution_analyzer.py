@@ -33,6 +33,11 @@ class SolutionAnalyzer:
         self.num_days = num_days
         self.hours_per_shift = hours_per_shift
 
+        # Indice tipo -> vincoli, costruito una volta: evita scansioni ripetute
+        self._hard_by_type: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for constraint in hard_constraints:
+            self._hard_by_type[constraint["type"]].append(constraint)
+
         # Estrai parametri dai vincoli
         self.coverage_requirements = self._extract_coverage_requirements()
 
@@ -57,17 +62,23 @@ class SolutionAnalyzer:
             ShiftType.SMONTO: 0
         }
 
-        for constraint in self.hard_constraints:
-            if constraint["type"] == "coverage_minimum":
-                params = constraint["params"]
-                return {
-                    ShiftType.MORNING: params.get("morning", 2),
-                    ShiftType.AFTERNOON: params.get("afternoon", 2),
-                    ShiftType.NIGHT: params.get("night", 1),
-                    ShiftType.SMONTO: 0  # Smonto non ha requisiti di copertura
-                }
+        coverage = self._hard_of_type("coverage_minimum")
+        if coverage:
+            params = coverage[0]["params"]
+            return {
+                ShiftType.MORNING: params.get("morning", 2),
+                ShiftType.AFTERNOON: params.get("afternoon", 2),
+                ShiftType.NIGHT: params.get("night", 1),
+                ShiftType.SMONTO: 0  # Smonto non ha requisiti di copertura
+            }
         return default_coverage
 
+    def _hard_of_type(self, *c_types: str) -> List[Dict[str, Any]]:
+        """Vincoli hard dei tipi indicati, in ordine di tipo (lookup O(1) per tipo)."""
+        if len(c_types) == 1:
+            return self._hard_by_type.get(c_types[0], [])
+        return [c for t in c_types for c in self._hard_by_type.get(t, [])]
+
     def _analyze_workload_balance(self) -> None:
         """Analizza il bilanciamento generale delle ore."""
         print("📊 ANALISI MONTE ORE")
@@ -194,10 +205,8 @@ class SolutionAnalyzer:
         print("=" * 50)
 
         incompatibilities = []
-        for constraint in self.hard_constraints:
-            if constraint["type"] == "incompatibility":
-                pairs = constraint["params"].get("pairs", [])
-                incompatibilities.extend(pairs)
+        for constraint in self._hard_of_type("incompatibility"):
+            incompatibilities.extend(constraint["params"].get("pairs", []))
 
         if not incompatibilities:
             print("✅ Nessuna incompatibilità definita")
@@ -222,15 +231,15 @@ class SolutionAnalyzer:
 
         max_consec_nights = None
         max_consec_days = None
-        has_smonto_constraints = False
 
-        for constraint in self.hard_constraints:
-            if constraint["type"] == "max_consecutive_nights":
-                max_consec_nights = constraint["params"].get("max", 3)
-            elif constraint["type"] == "max_consecutive_work_days":
-                max_consec_days = constraint["params"].get("max_days", 6)
-            elif constraint["type"] in ["mandatory_smonto_after_night", "mandatory_rest_after_smonto"]:
-                has_smonto_constraints = True
+        # In caso di duplicati vale l'ultimo, come nella scansione originale
+        for constraint in self._hard_of_type("max_consecutive_nights"):
+            max_consec_nights = constraint["params"].get("max", 3)
+        for constraint in self._hard_of_type("max_consecutive_work_days"):
+            max_consec_days = constraint["params"].get("max_days", 6)
+        has_smonto_constraints = bool(
+            self._hard_of_type("mandatory_smonto_after_night", "mandatory_rest_after_smonto")
+        )
 
         if max_consec_nights:
             print(f"🌙 Max notti consecutive: {max_consec_nights}")
@@ -244,7 +253,7 @@ class SolutionAnalyzer:
                 print("   ⚠️  Vincolo molto restrittivo per una settimana lavorativa")
 
         # Controllo riposo minimo
-        has_min_rest = any(c["type"] == "min_rest_hours" for c in self.hard_constraints)
+        has_min_rest = bool(self._hard_of_type("min_rest_hours"))
         if has_min_rest:
             print("😴 Vincolo riposo minimo: attivo (no notte→mattina)")
 
@@ -303,22 +312,22 @@ class SolutionAnalyzer:
             suggestions.append("🌙 Aggiungere flessibilità sui turni notturni (margine zero)")
 
         # Vincoli troppo rigidi
-        if any(c["type"] == "max_consecutive_work_days" and c["params"].get("max_days", 6) < 5
-               for c in self.hard_constraints):
+        if any(c["params"].get("max_days", 6) < 5
+               for c in self._hard_of_type("max_consecutive_work_days")):
             suggestions.append("📅 Rilassare il vincolo sui giorni lavorativi consecutivi")
 
         # Incompatibilità eccessive
         incompatibility_count = sum(
             len(c["params"].get("pairs", []))
-            for c in self.hard_constraints
-            if c["type"] == "incompatibility"
+            for c in self._hard_of_type("incompatibility")
         )
         if incompatibility_count >= len(self.nurses) // 3:
             suggestions.append("🚫 Ridurre il numero di incompatibilità tra infermieri")
 
         # Controllo vincoli smonto
-        has_smonto = any(c["type"] in ["mandatory_smonto_after_night", "mandatory_rest_after_smonto"]
-                        for c in self.hard_constraints)
+        has_smonto = bool(
+            self._hard_of_type("mandatory_smonto_after_night", "mandatory_rest_after_smonto")
+        )
         if has_smonto and night_required > 0:
             suggestions.append("🔄 Considerare che ogni notte richiede 2 giorni (notte+smonto)")
 
@@ -355,7 +364,6 @@ def compare_plans(plan_old: List[Dict], plan_new: List[Dict], nurses: List[Nurse
     
     # Statistiche delle modifiche
     total_changes = 0
-    affected_nurses = set()
     changes_by_day = defaultdict(int)
     changes_by_nurse = defaultdict(int)
     changes_by_type = defaultdict(int)
@@ -369,7 +377,6 @@ def compare_plans(plan_old: List[Dict], plan_new: List[Dict], nurses: List[Nurse
             
             if old_shift != new_shift:
                 total_changes += 1
-                affected_nurses.add(nurse_idx)
                 changes_by_day[day] += 1
                 changes_by_nurse[nurse_idx] += 1
                 
@@ -394,6 +401,9 @@ def compare_plans(plan_old: List[Dict], plan_new: List[Dict], nurses: List[Nurse
                     "change_type": change_type
                 })
     
+    # Infermieri coinvolti: le chiavi di changes_by_nurse, senza un .add() per modifica
+    affected_nurses = set(changes_by_nurse)
+    
     # Calcola metriche di impatto
     impact_percentage = (total_changes / (num_nurses * num_days)) * 100
     nurses_affected_percentage = (len(affected_nurses) / num_nurses) * 100
@@ -8,81 +8,37 @@ con supporto per scenari alternativi e modifiche iterative.
 import streamlit as st
 import os
 import calendar
+import hashlib
+import json
 import pickle
 import copy
-from datetime import datetime, timedelta
+import threading
+from dataclasses import asdict
+from datetime import datetime
 from typing import List, Dict, Any, Optional
+import numpy as np
 import pandas as pd
 
-from parser.nurse_loader import load_nurses
-from parser.hard_constraint_loader import load_hard_constraints
-from parser.soft_constraint_loader import load_soft_constraints
-
 from model.scheduler import Scheduler
 from utils.schedule_formatter import ScheduleFormatter
 from ortools.sat.python import cp_model
-from main import solve_model
+from main import solve_model, load_configuration, hints_from_schedule
 
 # Sistema di modifiche
 from modification_handler import ModificationHandler, Modification, Scenario
 from parser.solution_analyzer import compare_plans
 from utils.enums import ShiftType
+from utils.date_manager import ITALIAN_WEEKDAYS
 
-# Mappatura giorni della settimana in italiano
-ITALIAN_WEEKDAYS = {
-    0: "Lun", 1: "Mar", 2: "Mer", 3: "Gio", 
-    4: "Ven", 5: "Sab", 6: "Dom",
-}
-
-# File per persistenza stato
-CURRENT_PLAN_FILE = "current_plan.pkl"
-PLAN_METADATA_FILE = "plan_metadata.pkl"
-
-
-def init_session_state():
-    """Inizializza lo stato della sessione Streamlit."""
-    if 'current_plan' not in st.session_state:
-        st.session_state.current_plan = None
-    if 'plan_metadata' not in st.session_state:
-        st.session_state.plan_metadata = None
-    if 'modification_mode' not in st.session_state:
-        st.session_state.modification_mode = False
-    if 'generated_scenarios' not in st.session_state:
-        st.session_state.generated_scenarios = []
-    if 'selected_scenario_id' not in st.session_state:
-        st.session_state.selected_scenario_id = None
-
-
-def save_current_plan(plan: List[Dict], metadata: Dict):
-    """Salva il piano corrente su disco per persistenza."""
-    try:
-        with open(CURRENT_PLAN_FILE, 'wb') as f:
-            pickle.dump(plan, f)
-        with open(PLAN_METADATA_FILE, 'wb') as f:
-            pickle.dump(metadata, f)
-        st.session_state.current_plan = plan
-        st.session_state.plan_metadata = metadata
-    except Exception as e:
-        st.warning(f"Impossibile salvare piano: {e}")
-
-
-def load_current_plan() -> tuple[Optional[List[Dict]], Optional[Dict]]:
-    """Carica il piano corrente da disco."""
-    try:
-        if os.path.exists(CURRENT_PLAN_FILE) and os.path.exists(PLAN_METADATA_FILE):
-            with open(CURRENT_PLAN_FILE, 'rb') as f:
-                plan = pickle.load(f)
-            with open(PLAN_METADATA_FILE, 'rb') as f:
-                metadata = pickle.load(f)
-            return plan, metadata
-    except Exception as e:
-        st.warning(f"Impossibile caricare piano esistente: {e}")
-    return None, None
+# Nome mese -> numero (1-12), costruito una volta
+_MONTH_INDEX = {name: i for i, name in enumerate(calendar.month_name) if name}
 
+# st.fragment (Streamlit >= 1.37, prima experimental_fragment): rerun limitato al componente.
+# Nelle versioni che non lo supportano il decoratore non ha effetto.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
 
-def setup_page_style():
-    """Configura lo stile CSS della pagina."""
-    st.markdown("""
+# Foglio di stile della pagina (costante di modulo, costruita una sola volta)
+_PAGE_CSS = """
     <style>
     .main .block-container {
         max-width: 100% !important;
@@ -157,7 +113,60 @@ def setup_page_style():
         color: white;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+# File per persistenza stato
+CURRENT_PLAN_FILE = "current_plan.pkl"
+PLAN_METADATA_FILE = "plan_metadata.pkl"
+
+
+def init_session_state():
+    """Inizializza lo stato della sessione Streamlit."""
+    if 'current_plan' not in st.session_state:
+        st.session_state.current_plan = None
+    if 'plan_metadata' not in st.session_state:
+        st.session_state.plan_metadata = None
+    if 'modification_mode' not in st.session_state:
+        st.session_state.modification_mode = False
+    if 'generated_scenarios' not in st.session_state:
+        st.session_state.generated_scenarios = []
+    if 'selected_scenario_id' not in st.session_state:
+        st.session_state.selected_scenario_id = None
+
+
+def save_current_plan(plan: List[Dict], metadata: Dict):
+    """Salva il piano corrente su disco per persistenza."""
+    try:
+        with open(CURRENT_PLAN_FILE, 'wb') as f:
+            pickle.dump(plan, f)
+        with open(PLAN_METADATA_FILE, 'wb') as f:
+            pickle.dump(metadata, f)
+        st.session_state.current_plan = plan
+        st.session_state.plan_metadata = metadata
+    except Exception as e:
+        st.warning(f"Impossibile salvare piano: {e}")
+
+
+def load_current_plan() -> tuple[Optional[List[Dict]], Optional[Dict]]:
+    """Carica il piano corrente da disco."""
+    try:
+        if os.path.exists(CURRENT_PLAN_FILE) and os.path.exists(PLAN_METADATA_FILE):
+            with open(CURRENT_PLAN_FILE, 'rb') as f:
+                plan = pickle.load(f)
+            with open(PLAN_METADATA_FILE, 'rb') as f:
+                metadata = pickle.load(f)
+            return plan, metadata
+    except Exception as e:
+        st.warning(f"Impossibile caricare piano esistente: {e}")
+    return None, None
+
+
+def setup_page_style():
+    """
+    Configura lo stile CSS della pagina.
+    Va emesso ad ogni rerun: Streamlit rimuove gli elementi non ridisegnati.
+    """
+    st.markdown(_PAGE_CSS, unsafe_allow_html=True)
 
 
 def render_sidebar():
@@ -174,34 +183,151 @@ def render_sidebar():
     now = datetime.now()
     month_name = st.sidebar.selectbox("Mese", months, index=now.month - 1)
     year = st.sidebar.number_input("Anno", min_value=2000, max_value=2100, value=now.year)
-    month = months.index(month_name) + 1
+    month = _MONTH_INDEX[month_name]
     
     # Parametri risoluzione
     st.sidebar.markdown("### ⚡ Risoluzione")
     max_time = st.sidebar.slider("Tempo max (sec)", 30, 300, 120)
+    num_workers = st.sidebar.number_input(
+        "Worker paralleli", min_value=1, max_value=32,
+        value=min(16, os.cpu_count() or 8)
+    )
     
-    return data_folder, month, year, month_name, max_time
+    return data_folder, month, year, month_name, max_time, int(num_workers)
+
+
+@st.cache_data(show_spinner=False)
+def _cached_load_configuration(nurses_path: str, hard_path: str, soft_path: str, mtimes: tuple):
+    """
+    Carica la configurazione una sola volta per versione dei file.
+    mtimes fa parte della chiave di cache: modificare un JSON la invalida.
+    """
+    return load_configuration(nurses_path, hard_path, soft_path)
+
+
+def load_data(data_folder: str):
+    """
+    Carica infermieri e vincoli dalla cartella dati, senza rileggere i file
+    ad ogni rerun di Streamlit se non sono cambiati su disco.
+
+    :return: (nurses, hard_constraints, soft_constraints)
+    """
+    paths = tuple(
+        os.path.join(data_folder, name)
+        for name in ("nurses.json", "hard_constraints.json", "soft_constraints.json")
+    )
+    mtimes = tuple(os.path.getmtime(p) for p in paths)
+    return _cached_load_configuration(*paths, mtimes)
+
+
+def _config_key(nurses, hard_constraints, soft_constraints) -> str:
+    """Serializzazione canonica (JSON ordinato) degli input del solver."""
+    return json.dumps(
+        [[asdict(n) for n in nurses], hard_constraints, soft_constraints],
+        sort_keys=True, default=str,
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _get_scheduler(config_key: str, total_days: int, start_weekday: int,
+                   _nurses, _hard_constraints, _soft_constraints):
+    """
+    Scheduler con il modello CP-SAT già costruito, condiviso tra i rerun:
+    cambiare solo il tempo massimo non ricostruisce variabili e vincoli.
+    La risorsa è condivisa anche tra le sessioni: il lock serializza
+    costruzione e risoluzione, che modificano lo stesso CpModel.
+
+    :return: (scheduler, lock)
+    """
+    scheduler = Scheduler(
+        nurses=_nurses,
+        hard_constraints=_hard_constraints,
+        soft_constraints=_soft_constraints,
+        num_days=total_days,
+        start_weekday=start_weekday
+    )
+    return scheduler, threading.Lock()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _cached_solve(config_key: str, total_days: int, start_weekday: int, max_time: int,
+                  num_workers: int, _nurses, _hard_constraints, _soft_constraints, _hints=None):
+    """
+    Risolve il modello memorizzando il risultato per input identici.
+    I parametri con underscore non vengono hashati da Streamlit: la chiave è
+    config_key, che li rappresenta interamente.
+
+    :param _hints: hint di warm-start (non fanno parte della chiave: influenzano
+        solo la velocità di ricerca)
+    :return: (status, schedule)
+    """
+    scheduler, lock = _get_scheduler(
+        config_key, total_days, start_weekday,
+        _nurses, _hard_constraints, _soft_constraints
+    )
+    with lock:
+        # Hint passati alla singola risoluzione: nessuno stato lasciato sullo scheduler
+        return scheduler.solve(max_seconds=max_time, num_workers=num_workers, hints=_hints)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_shift_matrix(schedule_key: str, nurse_names: tuple, _schedule, _nurses) -> List[List[str]]:
+    """
+    Matrice [infermiere][giorno] memorizzata per piano e infermieri.
+    schedule_key (JSON del piano) e nurse_names identificano gli argomenti con underscore.
+    """
+    date_labels = [f"Day{i}" for i in range(len(_schedule))]
+    return ScheduleFormatter(_nurses, date_labels, "Matrix")._build_shift_matrix(_schedule)
+
+
+def _schedule_key(schedule: List[Dict]) -> str:
+    """Chiave di cache del piano: JSON canonico, veloce da hashare per Streamlit."""
+    return json.dumps(schedule, sort_keys=True, default=str)
+
+
+def get_shift_matrix(schedule: List[Dict], nurses, schedule_key: Optional[str] = None) -> List[List[str]]:
+    """Restituisce la matrice turni del piano senza ricostruirla ad ogni rerun."""
+    return _cached_shift_matrix(
+        schedule_key or _schedule_key(schedule),
+        tuple(n.name for n in nurses),
+        schedule, nurses
+    )
+
+
+def _build_day_columns(date_labels: List[datetime]):
+    """
+    Etichette di colonna per la tabella turni in un solo passaggio sulle date.
+
+    :return: (columns "Lun 01", day_labels "01/09", weekend_mask)
+    """
+    columns, day_labels, weekend_mask = [], [], []
+    for d in date_labels:
+        weekday = d.weekday()
+        columns.append(f"{ITALIAN_WEEKDAYS[weekday]} {d.day:02d}")
+        day_labels.append(f"{d.day:02d}/{d.month:02d}")
+        weekend_mask.append(weekday >= 5)  # Sabato o domenica
+    return columns, day_labels, weekend_mask
 
 
 def calculate_period_info(month: int, year: int):
     """Calcola informazioni sul periodo selezionato."""
     start_date = datetime(year, month, 1)
-    last_day = calendar.monthrange(year, month)[1]
-    end_date = datetime(year, month, last_day)
-    total_days = (end_date - start_date).days + 1
-    date_labels = [start_date + timedelta(days=i) for i in range(total_days)]
-    start_weekday = start_date.weekday()
+    total_days = calendar.monthrange(year, month)[1]
+    # Tutte le date del mese in un'unica chiamata vettoriale
+    dates = pd.date_range(start_date, periods=total_days, freq="D")
+    end_date = dates[-1].to_pydatetime()
+    date_labels = list(dates.to_pydatetime())
+    start_weekday = int(dates.weekday[0])
     
     return start_date, end_date, total_days, date_labels, start_weekday
 
 
-def generate_initial_plan(data_folder: str, total_days: int, start_weekday: int, max_time: int, period_desc: str, start_date: datetime = None):
+def generate_initial_plan(data_folder: str, total_days: int, start_weekday: int, max_time: int, period_desc: str,
+                          start_date: datetime = None, num_workers: int = 8):
     """Genera il piano iniziale."""
     try:
         # Carica dati
-        nurses = load_nurses(os.path.join(data_folder, "nurses.json"))
-        hard_constraints = load_hard_constraints(os.path.join(data_folder, "hard_constraints.json"))
-        soft_constraints = load_soft_constraints(os.path.join(data_folder, "soft_constraints.json"))
+        nurses, hard_constraints, soft_constraints = load_data(data_folder)
         
         # Info caricamento
         col1, col2, col3 = st.columns(3)
@@ -212,11 +338,31 @@ def generate_initial_plan(data_folder: str, total_days: int, start_weekday: int,
         with col3:
             st.metric("🔓 Vincoli Soft", len(soft_constraints))
         
+        config_key = _config_key(nurses, hard_constraints, soft_constraints)
+        input_hash = hashlib.blake2b(
+            json.dumps([config_key, period_desc, total_days, start_weekday]).encode()
+        ).hexdigest()
+        
+        # Warm-start dall'ultimo piano salvato per lo stesso periodo
+        hints = None
+        saved_plan, saved_metadata = load_current_plan()
+        if (saved_plan and saved_metadata
+                and saved_metadata.get('period_desc') == period_desc
+                and len(saved_plan) == total_days):
+            if saved_metadata.get('input_hash') == input_hash:
+                # Stessi input del piano salvato: nessuna nuova risoluzione
+                st.info("♻️ Riutilizzo piano esistente (configurazione invariata)")
+                st.session_state.current_plan = saved_plan
+                st.session_state.plan_metadata = saved_metadata
+                return nurses, hard_constraints, soft_constraints, saved_plan
+            hints = hints_from_schedule(saved_plan, nurses)
+        
         # Generazione piano
         with st.spinner('🔄 Generazione piano iniziale...'):
-            status, schedule = solve_model(
-                nurses, hard_constraints, soft_constraints,
-                total_days, start_weekday, max_time
+            status, schedule = _cached_solve(
+                config_key,
+                total_days, start_weekday, max_time, num_workers,
+                nurses, hard_constraints, soft_constraints, hints
             )
         
         if status == cp_model.INFEASIBLE:
@@ -234,7 +380,8 @@ def generate_initial_plan(data_folder: str, total_days: int, start_weekday: int,
             'start_weekday': start_weekday,
             'start_date': start_date,
             'generation_time': datetime.now(),
-            'status': 'optimal' if status == cp_model.OPTIMAL else 'feasible'
+            'status': 'optimal' if status == cp_model.OPTIMAL else 'feasible',
+            'input_hash': input_hash
         }
         
         save_current_plan(schedule, metadata)
@@ -256,6 +403,37 @@ def generate_initial_plan(data_folder: str, total_days: int, start_weekday: int,
         return None, None, None, None
 
 
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _build_schedule_view(view_key: str, _shift_matrix, _nurse_names, _contract_hours,
+                         _columns, _weekend_columns):
+    """
+    Costruisce DataFrame e Styler della tabella turni.
+    cache_resource restituisce lo stesso oggetto senza copiarlo né serializzarlo:
+    il Styler viene ricalcolato solo quando cambiano piano o periodo.
+    Streamlit hasha solo view_key (stringa); gli argomenti con underscore,
+    che essa identifica, non vengono attraversati ad ogni rerun.
+
+    :return: (df, styled_df)
+    """
+    # Crea DataFrame direttamente dalla matrice turni (nessuna trasposizione in Python)
+    shift_array = np.asarray(_shift_matrix)
+    df = pd.DataFrame(shift_array, index=_nurse_names, columns=_columns)
+    
+    # Colonne riepilogo, inserite in testa
+    effective_hours = (np.isin(shift_array, ("M", "P", "N")).sum(axis=1) * 8).tolist()
+    diff_hours = [eff - ctr for eff, ctr in zip(effective_hours, _contract_hours)]
+    
+    df.insert(0, "Ore Ctr", [f"{int(c)}h" for c in _contract_hours])
+    df.insert(1, "Ore Eff", [f"{h}h" for h in effective_hours])
+    df.insert(2, "Diff", [f"{d:+.0f}h" for d in diff_hours])
+    
+    # Styling weekend: stile statico sul sottoinsieme di colonne, nessuna callback per cella
+    styled_df = df.style.set_properties(
+        subset=_weekend_columns, **{'background-color': '#1565c0', 'color': 'white'}
+    )
+    return df, styled_df
+
+
 def display_schedule_table(schedule: List[Dict], nurses, date_labels: List[datetime], metadata: Dict):
     """Visualizza la tabella dei turni."""
     st.markdown('<div class="section-header"><h3>📅 Piano Turni</h3></div>', unsafe_allow_html=True)
@@ -269,47 +447,21 @@ def display_schedule_table(schedule: List[Dict], nurses, date_labels: List[datet
     with col3:
         st.info(f"🎯 **Qualità:** {metadata['status'].title()}")
     
-    # Prepara dati tabella
-    formatter = ScheduleFormatter(nurses, [d.strftime("%d/%m") for d in date_labels], metadata['period_desc'])
-    shift_matrix = formatter._build_shift_matrix(schedule)
-    
-    # Identifica weekend
-    weekend_columns = set()
-    columns = []
-    for i, d in enumerate(date_labels):
-        day_name = ITALIAN_WEEKDAYS[d.weekday()]
-        col_name = f"{day_name} {d.day:02d}"
-        columns.append(col_name)
-        if d.weekday() in [5, 6]:  # Sabato o domenica
-            weekend_columns.add(col_name)
-    
-    # Crea DataFrame
-    data_dict = {}
+    # Prepara etichette, colonne e weekend in un solo passaggio sulle date
+    columns, day_labels, weekend_mask = _build_day_columns(date_labels)
+    weekend_columns = [col for col, is_weekend in zip(columns, weekend_mask) if is_weekend]
     
-    # Colonne riepilogo
+    formatter = ScheduleFormatter(nurses, day_labels, metadata['period_desc'])
+    schedule_key = _schedule_key(schedule)
+    shift_matrix = get_shift_matrix(schedule, nurses, schedule_key)
+    nurse_names = [n.name for n in nurses]
     contract_hours = [formatter._calculate_contract_hours_for_period(n.contracted_hours) for n in nurses]
-    effective_hours = [row.count("M") * 8 + row.count("P") * 8 + row.count("N") * 8 for row in shift_matrix]
-    diff_hours = [eff - ctr for eff, ctr in zip(effective_hours, contract_hours)]
-    
-    data_dict["Ore Ctr"] = [f"{int(c)}h" for c in contract_hours]
-    data_dict["Ore Eff"] = [f"{h}h" for h in effective_hours]
-    data_dict["Diff"] = [f"{d:+.0f}h" for d in diff_hours]
-    
-    # Colonne turni
-    for col, day_shifts in zip(columns, zip(*shift_matrix)):
-        data_dict[col] = list(day_shifts)
-    
-    df = pd.DataFrame(data_dict, index=[n.name for n in nurses])
-    
-    # Styling weekend
-    def highlight_weekends(x):
-        styles = pd.DataFrame('', index=x.index, columns=x.columns)
-        for col in x.columns:
-            if col in weekend_columns:
-                styles[col] = 'background-color: #1565c0; color: white'
-        return styles
     
-    styled_df = df.style.apply(highlight_weekends, axis=None)
+    # DataFrame e Styler costruiti una sola volta per piano/periodo
+    view_key = json.dumps([schedule_key, nurse_names, contract_hours, columns])
+    df, styled_df = _build_schedule_view(
+        view_key, shift_matrix, nurse_names, contract_hours, columns, weekend_columns
+    )
     
     # Wrapper per stile verde scuro
     st.markdown('<div class="main-schedule-table">', unsafe_allow_html=True)
@@ -321,8 +473,27 @@ def display_schedule_table(schedule: List[Dict], nurses, date_labels: List[datet
     return shift_matrix, df
 
 
+# Turni selezionabili nel form modifiche: lettera -> etichetta
+_SHIFT_OPTIONS = {
+    'M': '🌅 Mattino',
+    'P': '🌞 Pomeriggio',
+    'N': '🌙 Notte',
+    'S': '🔄 Smonto',
+    'R': '😴 Riposo'
+}
+
+
+def _day_option_label(day_idx: int) -> str:
+    """Etichetta del giorno nel form modifiche."""
+    return f"Giorno {day_idx + 1}"
+
+
+@_fragment
 def render_modification_interface(nurses, hard_constraints, soft_constraints, current_plan, metadata, max_time):
-    """Renderizza l'interfaccia per le modifiche ai turni."""
+    """
+    Renderizza l'interfaccia per le modifiche ai turni.
+    È un fragment: cambiare infermiere/giorno/turno riesegue solo questo blocco.
+    """
     
     st.markdown('<div class="section-header"><h3>✏️ Modifica Turni</h3></div>', unsafe_allow_html=True)
     
@@ -337,18 +508,14 @@ def render_modification_interface(nurses, hard_constraints, soft_constraints, cu
         selected_nurse = st.selectbox("👤 Infermiere", nurse_names, key="mod_nurse")
     
     with col2:
-        days_options = [(i, f"Giorno {i+1}") for i in range(metadata['total_days'])]
-        selected_day_idx, selected_day_label = st.selectbox("📅 Giorno", days_options, format_func=lambda x: x[1], key="mod_day")
+        # Opzioni scalari (indici/lettere): stato del widget minimo, etichette via format_func
+        selected_day_idx = st.selectbox("📅 Giorno", range(metadata['total_days']),
+                                        format_func=_day_option_label, key="mod_day")
+        selected_day_label = _day_option_label(selected_day_idx)
     
     with col3:
-        shift_options = [
-            ('M', '🌅 Mattino'),
-            ('P', '🌞 Pomeriggio'), 
-            ('N', '🌙 Notte'),
-            ('S', '🔄 Smonto'),
-            ('R', '😴 Riposo')
-        ]
-        selected_shift, shift_label = st.selectbox("🔄 Nuovo Turno", shift_options, format_func=lambda x: x[1], key="mod_shift")
+        selected_shift = st.selectbox("🔄 Nuovo Turno", list(_SHIFT_OPTIONS),
+                                      format_func=lambda x: _SHIFT_OPTIONS[x], key="mod_shift")
     
     with col4:
         reason = st.text_input("📝 Motivo", placeholder="es. Cambio richiesto", key="mod_reason")
@@ -367,6 +534,9 @@ def render_modification_interface(nurses, hard_constraints, soft_constraints, cu
     if st.button("🎭 Genera Scenari Alternativi", type="primary", key="generate_scenarios_btn"):
         generate_scenarios(nurses, hard_constraints, soft_constraints, current_plan, metadata, 
                          selected_nurse, selected_day_idx, selected_shift, reason, max_time)
+        # Gli scenari sono visualizzati fuori dal fragment: serve un rerun completo
+        if st.session_state.generated_scenarios:
+            st.rerun()
 
 
 def get_current_shift(plan: List[Dict], nurses, nurse_name: str, day: int) -> str:
@@ -375,10 +545,8 @@ def get_current_shift(plan: List[Dict], nurses, nurse_name: str, day: int) -> st
         # Trova l'indice dell'infermiere
         nurse_idx = next(i for i, n in enumerate(nurses) if n.name == nurse_name)
         
-        # Converte piano in matrice
-        date_labels = [f"Day{i}" for i in range(len(plan))]
-        formatter = ScheduleFormatter(nurses, date_labels, "Current")
-        shift_matrix = formatter._build_shift_matrix(plan)
+        # Converte piano in matrice (memorizzata tra le chiamate)
+        shift_matrix = get_shift_matrix(plan, nurses)
         
         return shift_matrix[nurse_idx][day]
     except:
@@ -611,7 +779,7 @@ def display_scenario_schedule_table(scenario: Scenario, original_plan: List[Dict
             try:
                 month_name = period_parts[0]
                 year = int(period_parts[1])
-                month = list(calendar.month_name)[1:].index(month_name) + 1
+                month = _MONTH_INDEX[month_name]
                 start_date = datetime(year, month, 1)
             except:
                 pass
@@ -622,80 +790,39 @@ def display_scenario_schedule_table(scenario: Scenario, original_plan: List[Dict
         return
     
     # Genera le date labels corrette
-    date_labels = [start_date + timedelta(days=i) for i in range(metadata['total_days'])]
+    date_labels = list(pd.date_range(start_date, periods=metadata['total_days'], freq="D").to_pydatetime())
     
     # Prepara dati tabella
-    formatter = ScheduleFormatter(nurses, [d.strftime("%d/%m") for d in date_labels], f"Scenario - {metadata['period_desc']}")
-    scenario_matrix = formatter._build_shift_matrix(scenario.plan)
-    original_matrix = formatter._build_shift_matrix(original_plan)
-    
-    # Identifica weekend e modifiche
-    weekend_columns = set()
-    modified_cells = set()  # (nurse_idx, day_idx)
-    columns = []
-    
-    for i, d in enumerate(date_labels):
-        day_name = ITALIAN_WEEKDAYS[d.weekday()]
-        col_name = f"{day_name} {d.day:02d}"
-        columns.append(col_name)
-        if d.weekday() in [5, 6]:  # Sabato o domenica
-            weekend_columns.add(col_name)
-    
-    # Identifica celle modificate
-    for nurse_idx in range(len(nurses)):
-        for day_idx in range(metadata['total_days']):
-            if scenario_matrix[nurse_idx][day_idx] != original_matrix[nurse_idx][day_idx]:
-                modified_cells.add((nurse_idx, day_idx))
+    columns, day_labels, weekend_mask = _build_day_columns(date_labels)
+    formatter = ScheduleFormatter(nurses, day_labels, f"Scenario - {metadata['period_desc']}")
+    scenario_array = np.asarray(get_shift_matrix(scenario.plan, nurses))
+    original_array = np.asarray(get_shift_matrix(original_plan, nurses))
+    
+    # Maschera [infermiere][giorno] delle celle modificate
+    modified_mask = scenario_array != original_array
     
     # Crea DataFrame
-    data_dict = {}
+    df = pd.DataFrame(scenario_array, index=[n.name for n in nurses], columns=columns)
     
     # Colonne riepilogo
     contract_hours = [formatter._calculate_contract_hours_for_period(n.contracted_hours) for n in nurses]
-    effective_hours = [row.count("M") * 8 + row.count("P") * 8 + row.count("N") * 8 for row in scenario_matrix]
+    effective_hours = (np.isin(scenario_array, ("M", "P", "N")).sum(axis=1) * 8).tolist()
     diff_hours = [eff - ctr for eff, ctr in zip(effective_hours, contract_hours)]
     
-    data_dict["Ore Ctr"] = [f"{int(c)}h" for c in contract_hours]
-    data_dict["Ore Eff"] = [f"{h}h" for h in effective_hours]
-    data_dict["Diff"] = [f"{d:+.0f}h" for d in diff_hours]
-    
-    # Colonne turni
-    for col, day_shifts in zip(columns, zip(*scenario_matrix)):
-        data_dict[col] = list(day_shifts)
+    df.insert(0, "Ore Ctr", [f"{int(c)}h" for c in contract_hours])
+    df.insert(1, "Ore Eff", [f"{h}h" for h in effective_hours])
+    df.insert(2, "Diff", [f"{d:+.0f}h" for d in diff_hours])
     
-    df = pd.DataFrame(data_dict, index=[n.name for n in nurses])
-    
-    # Styling avanzato per weekend E modifiche
-    def highlight_scenario_changes(x):
-        styles = pd.DataFrame('', index=x.index, columns=x.columns)
-        
-        # Crea mapping colonne -> giorno
-        day_columns = {}
-        for day_idx, col_name in enumerate(columns):
-            day_columns[col_name] = day_idx
-        
-        for col in x.columns:
-            if col in weekend_columns:
-                # Weekend: gestisce weekend + eventuali modifiche
-                day_idx = day_columns.get(col, -1)
-                for row_idx in range(len(x.index)):
-                    if day_idx >= 0 and (row_idx, day_idx) in modified_cells:
-                        # Modifica + Weekend: rosso scuro con testo bianco
-                        styles[col].iloc[row_idx] = 'background-color: #8b0000; color: white; font-weight: bold;'
-                    else:
-                        # Solo Weekend: blu scuro come originale
-                        styles[col].iloc[row_idx] = 'background-color: #1565c0; color: white'
-            elif col in day_columns:
-                # Colonne giorni (non weekend): gestisce solo modifiche
-                day_idx = day_columns[col]
-                for row_idx in range(len(x.index)):
-                    if (row_idx, day_idx) in modified_cells:
-                        # Solo modifica: rosso scuro con testo bianco
-                        styles[col].iloc[row_idx] = 'background-color: #8b0000; color: white; font-weight: bold;'
-        
-        return styles
+    # Styling weekend E modifiche calcolato in blocco: la modifica prevale sul weekend
+    day_styles = np.where(
+        modified_mask,
+        'background-color: #8b0000; color: white; font-weight: bold;',
+        np.where(np.asarray(weekend_mask)[np.newaxis, :], 'background-color: #1565c0; color: white', '')
+    )
+    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+    styles[columns] = day_styles
     
-    styled_df = df.style.apply(highlight_scenario_changes, axis=None)
+    styled_df = df.style.apply(lambda _: styles, axis=None)
     
     # Tabella scenario senza stile verde scuro  
     st.dataframe(styled_df, use_container_width=True)
@@ -707,12 +834,12 @@ def display_scenario_schedule_table(scenario: Scenario, original_plan: List[Dict
     """)
     
     # Info modifiche
-    if modified_cells:
+    if modified_mask.any():
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("🔄 Celle Modificate", len(modified_cells))
+            st.metric("🔄 Celle Modificate", int(modified_mask.sum()))
         with col2:
-            modified_nurses = len(set(nurse_idx for nurse_idx, _ in modified_cells))
+            modified_nurses = int(modified_mask.any(axis=1).sum())
             st.metric("👥 Infermieri Coinvolti", modified_nurses)
 
 
@@ -723,6 +850,8 @@ def apply_selected_scenario(scenario: Scenario, metadata: Dict):
         # Aggiorna metadata
         new_metadata = metadata.copy()
         new_metadata['last_modification'] = datetime.now()
+        # Il piano modificato non è più il risultato diretto degli input
+        new_metadata.pop('input_hash', None)
         new_metadata['modification_count'] = new_metadata.get('modification_count', 0) + 1
         
         # Salva nuovo piano
@@ -748,33 +877,24 @@ def display_statistics(schedule: List[Dict], nurses):
     st.markdown('<div class="section-header"><h3>📊 Statistiche</h3></div>', unsafe_allow_html=True)
     
     # Prepara dati
-    date_labels = [f"Day{i}" for i in range(len(schedule))]
-    formatter = ScheduleFormatter(nurses, date_labels, "Stats")
-    shift_matrix = formatter._build_shift_matrix(schedule)
-    
-    # Statistiche per infermiere
-    stats_data = []
-    for i, (nurse, row) in enumerate(zip(nurses, shift_matrix)):
-        m = row.count("M")
-        p = row.count("P") 
-        n = row.count("N")
-        s = row.count("S")
-        r = row.count("R")
-        total_shifts = m + p + n
-        
-        stats_data.append({
-            "Infermiere": nurse.name,
-            "Mattino": m,
-            "Pomeriggio": p,
-            "Notte": n,
-            "Smonto": s,
-            "Riposi": r,
-            "Tot turni": total_shifts,
-            "Ore lavorate": f"{total_shifts * 8}h",
-            "Ore contratto": f"{nurse.contracted_hours}h"
-        })
-    
-    stats_df = pd.DataFrame(stats_data)
+    shift_matrix = get_shift_matrix(schedule, nurses)
+    
+    # Statistiche per infermiere: conteggi per lettera in un solo passaggio vettoriale
+    shift_array = np.asarray(shift_matrix)
+    counts = {letter: (shift_array == letter).sum(axis=1) for letter in ("M", "P", "N", "S", "R")}
+    total_shifts = counts["M"] + counts["P"] + counts["N"]
+    
+    stats_df = pd.DataFrame({
+        "Infermiere": [nurse.name for nurse in nurses],
+        "Mattino": counts["M"],
+        "Pomeriggio": counts["P"],
+        "Notte": counts["N"],
+        "Smonto": counts["S"],
+        "Riposi": counts["R"],
+        "Tot turni": total_shifts,
+        "Ore lavorate": [f"{t * 8}h" for t in total_shifts.tolist()],
+        "Ore contratto": [f"{nurse.contracted_hours}h" for nurse in nurses]
+    })
     
     # Wrapper per stile verde scuro
     st.markdown('<div class="main-schedule-table">', unsafe_allow_html=True)
@@ -783,10 +903,10 @@ def display_statistics(schedule: List[Dict], nurses):
     
     # Riepilogo generale
     st.markdown("#### 📈 Riepilogo Generale")
-    total_m = sum(row.count("M") for row in shift_matrix)
-    total_p = sum(row.count("P") for row in shift_matrix) 
-    total_n = sum(row.count("N") for row in shift_matrix)
-    total_s = sum(row.count("S") for row in shift_matrix)
+    total_m = int(counts["M"].sum())
+    total_p = int(counts["P"].sum())
+    total_n = int(counts["N"].sum())
+    total_s = int(counts["S"].sum())
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -816,7 +936,7 @@ def main():
     setup_page_style()
     
     # Sidebar
-    data_folder, month, year, month_name, max_time = render_sidebar()
+    data_folder, month, year, month_name, max_time, num_workers = render_sidebar()
     
     # Calcola periodo
     start_date, end_date, total_days, date_labels, start_weekday = calculate_period_info(month, year)
@@ -842,9 +962,7 @@ def main():
             
             # Carica dati per modifiche
             try:
-                nurses = load_nurses(os.path.join(data_folder, "nurses.json"))
-                hard_constraints = load_hard_constraints(os.path.join(data_folder, "hard_constraints.json"))
-                soft_constraints = load_soft_constraints(os.path.join(data_folder, "soft_constraints.json"))
+                nurses, hard_constraints, soft_constraints = load_data(data_folder)
                 
                 # Visualizza piano attuale
                 shift_matrix, df = display_schedule_table(st.session_state.current_plan, nurses, date_labels, current_metadata)
@@ -875,7 +993,8 @@ def main():
         st.markdown("### 🚀 Genera Nuovo Piano")
         
         if st.button("🔄 Genera Turni", type="primary"):
-            result = generate_initial_plan(data_folder, total_days, start_weekday, max_time, period_desc, start_date)
+            result = generate_initial_plan(data_folder, total_days, start_weekday, max_time, period_desc,
+                                           start_date, num_workers)
             nurses, hard_constraints, soft_constraints, schedule = result
             
             if schedule:
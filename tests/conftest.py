@@ -0,0 +1,10 @@
+"""
+tests/conftest.py
+-----------------
+Rende importabili i moduli del progetto (model, utils, parser) dai test.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,35 @@
+"""
+tests/test_equity.py
+--------------------
+Il soft constraint equity non deve mai rendere il modello infeasible.
+"""
+
+from ortools.sat.python import cp_model
+
+from model.constraint_registry import registry
+from model.nurse import Nurse
+from utils.enums import ShiftType
+
+
+def test_target_above_num_days_stays_feasible():
+    # Un solo infermiere e 5 turni al giorno: target = 35 turni su 7 giorni
+    num_days, weight = 7, 10
+    nurses = [Nurse("solo", 160)]
+    model = cp_model.CpModel()
+    nurse_shift = {
+        (0, d, s.value): model.NewBoolVar(f"n0_d{d}_s{s.value}")
+        for d in range(num_days)
+        for s in ShiftType
+    }
+    for d in range(num_days):
+        model.Add(cp_model.LinearExpr.Sum([nurse_shift[0, d, s.value] for s in ShiftType]) <= 1)
+
+    terms = registry.soft["equity"](model, nurse_shift, nurses, {"daily_shifts": 5}, num_days, weight)
+    model.Maximize(cp_model.LinearExpr.WeightedSum(
+        [t.expr for t in terms], [t.weight for t in terms]
+    ))
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 1
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    # Lavora tutti i 7 giorni: restano 28 turni sotto il target
+    assert round(solver.ObjectiveValue()) == -weight * (35 - num_days)
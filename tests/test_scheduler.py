@@ -0,0 +1,64 @@
+"""
+tests/test_scheduler.py
+-----------------------
+Comportamento dello Scheduler tra risoluzioni successive dello stesso modello.
+"""
+
+from model.nurse import Nurse
+from model.scheduler import Scheduler
+from utils.enums import ShiftType
+
+
+def test_hints_do_not_leak_into_next_solve():
+    nurses = [Nurse("a", 160), Nurse("b", 160)]
+    scheduler = Scheduler(nurses, [], [], num_days=2, min_coverage={s: 0 for s in ShiftType})
+
+    scheduler.solve(max_seconds=5, num_workers=1, hints={(0, 0, ShiftType.MORNING.value): 1})
+    assert len(scheduler.model.Proto().solution_hint.vars) == 1
+
+    # Una risoluzione senza hint non riusa quelli della chiamata precedente
+    scheduler.solve(max_seconds=5, num_workers=1)
+    assert len(scheduler.model.Proto().solution_hint.vars) == 0
+
+
+def test_symmetry_breaking_skips_nurses_named_in_other_constraints():
+    # Stesso contratto, ma forced_assignment li distingue: b lavora, a mai.
+    # Ordinare i giorni lavorati (a >= b) renderebbe il modello infeasible
+    nurses = [Nurse("a", 160), Nurse("b", 160)]
+    num_days = 2
+    assignments = [(1, 0, ShiftType.MORNING.value, True)] + [
+        (0, d, s.value, False) for d in range(num_days) for s in ShiftType
+    ]
+    hard = [
+        {"type": "symmetry_breaking", "params": {}},
+        {"type": "forced_assignment", "params": {"assignments": assignments}},
+    ]
+    scheduler = Scheduler(nurses, hard, [], num_days=num_days, min_coverage={s: 0 for s in ShiftType})
+
+    status, schedule = scheduler.solve(max_seconds=5, num_workers=1)
+    assert schedule and schedule[0]["morning"] == ["b"]
+
+
+def test_weekly_redundant_follows_active_daily_coverage():
+    # Copertura 1/1/1 con 3 infermieri: ognuno lavora ogni giorno. Totali
+    # settimanali presi da default propri (2/2/1) renderebbero il modello infeasible
+    nurses = [Nurse("a", 160), Nurse("b", 160), Nurse("c", 160)]
+    hard = [
+        {"type": "coverage_minimum", "params": {"morning": 1, "afternoon": 1, "night": 1}},
+        {"type": "weekly_redundant", "params": {}},
+    ]
+    scheduler = Scheduler(nurses, hard, [], num_days=7, min_coverage={s: 0 for s in ShiftType})
+
+    status, schedule = scheduler.solve(max_seconds=5, num_workers=1)
+    assert len(schedule) == 7
+
+
+def test_stability_penalty_hints_reach_the_solver():
+    nurses = [Nurse("a", 160), Nurse("b", 160)]
+    original = {(0, 0, ShiftType.MORNING.value): 1, (1, 0, ShiftType.MORNING.value): 0}
+    soft = [{"type": "stability_penalty", "weight": 1, "params": {"original_plan_hints": original}}]
+    scheduler = Scheduler(nurses, [], soft, num_days=2, min_coverage={s: 0 for s in ShiftType})
+
+    # Senza hint per la risoluzione il warm-start è il piano originale
+    scheduler.solve(max_seconds=5, num_workers=1)
+    assert len(scheduler.model.Proto().solution_hint.vars) == len(original)
@@ -0,0 +1,102 @@
+"""
+tests/test_shift_blocks.py
+--------------------------
+Equivalenza del soft constraint shift_blocks con la definizione originale:
+a piano fissato, l'obiettivo ottimo deve valere esattamente il premio dei
+blocchi presenti nel piano.
+"""
+
+import random
+
+from ortools.sat.python import cp_model
+
+from model.constraint_registry import registry
+from model.nurse import Nurse
+from utils.enums import ShiftType
+
+WORKING_SHIFTS = (ShiftType.MORNING.value, ShiftType.AFTERNOON.value, ShiftType.NIGHT.value)
+
+
+def reference_score(plan, num_days, min_block_size, bonus_block_size, weight):
+    """
+    Premio dei blocchi secondo la definizione originale: un blocco è una
+    sequenza massimale di turni uguali che inizia entro num_days - min_block_size.
+
+    :param plan: per ogni infermiere, lista giornaliera del turno (None = riposo)
+    :return: premio totale
+    """
+    score = 0
+    for days in plan:
+        for shift_val in WORKING_SHIFTS:
+            start = 0
+            while start < num_days:
+                if days[start] != shift_val or (start > 0 and days[start - 1] == shift_val):
+                    start += 1
+                    continue
+                size = 1
+                while start + size < num_days and days[start + size] == shift_val:
+                    size += 1
+                if start <= num_days - min_block_size:
+                    if min_block_size <= size <= bonus_block_size:
+                        score += weight * 2 if size == bonus_block_size else weight
+                    if size in (4, 5):
+                        score += weight * 3 // size
+                start += size
+    return score
+
+
+def solve_fixed_plan(plan, nurses, num_days, params, weight):
+    """Fissa il piano nel modello e restituisce l'obiettivo ottimo di shift_blocks."""
+    model = cp_model.CpModel()
+    nurse_shift = {
+        (i, d, s.value): model.NewBoolVar(f"n{i}_d{d}_s{s.value}")
+        for i in range(len(nurses))
+        for d in range(num_days)
+        for s in ShiftType
+    }
+    for (i, d, sv), var in nurse_shift.items():
+        model.Add(var == int(plan[i][d] == sv))
+
+    terms = registry.soft["shift_blocks"](model, nurse_shift, nurses, params, num_days, weight, 0)
+    if not terms:
+        return 0
+    model.Maximize(cp_model.LinearExpr.WeightedSum(
+        [t.expr for t in terms], [t.weight for t in terms]
+    ))
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 1
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    return round(solver.ObjectiveValue())
+
+
+def test_low_contract_hours_keep_block_rewards():
+    # Tre infermieri con 8 ore: il contratto non limita i premi dei blocchi.
+    # Tre mattine di fila sono un blocco bonus: 2 * 150 per infermiere
+    nurses = [Nurse(f"n{i}", 8) for i in range(3)]
+    plan = [[ShiftType.MORNING.value] * 3 + [None] * 4 for _ in nurses]
+    params = {"min_block_size": 2, "bonus_block_size": 3}
+    assert solve_fixed_plan(plan, nurses, 7, params, 150) == 900
+
+
+def test_random_plans_match_reference():
+    rng = random.Random(1234)
+    choices = list(WORKING_SHIFTS) + [ShiftType.SMONTO.value, None]
+    for _ in range(60):
+        num_days = rng.randint(2, 10)
+        nurses = [Nurse(f"n{i}", rng.choice([8, 16, 40, 128, 160])) for i in range(rng.randint(1, 3))]
+        min_block_size = rng.randint(1, 3)
+        bonus_block_size = rng.randint(min_block_size, 5)
+        weight = rng.randint(1, 200)
+        # Turni ripetuti con probabilità alta, così compaiono blocchi lunghi
+        plan = []
+        for _ in nurses:
+            days = [rng.choice(choices)]
+            for _ in range(num_days - 1):
+                days.append(days[-1] if rng.random() < 0.6 else rng.choice(choices))
+            plan.append(days)
+
+        params = {"min_block_size": min_block_size, "bonus_block_size": bonus_block_size}
+        expected = reference_score(plan, num_days, min_block_size, bonus_block_size, weight)
+        assert solve_fixed_plan(plan, nurses, num_days, params, weight) == expected, (
+            plan, params, weight
+        )
@@ -7,10 +7,13 @@ Supporta solo pianificazione mensile.
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Tuple
 import calendar
 
+# Giorni della settimana in italiano, indicizzati per weekday() (0=lunedì)
+ITALIAN_WEEKDAYS = ("Lun", "Mar", "Mer", "Gio", "Ven", "Sab", "Dom")
+
 
 class DateManager:
     """Gestione intelligente dei periodi di pianificazione."""
@@ -55,15 +58,20 @@ class DateManager:
         :return: lista di stringhe formato "Lun 01/07"
         """
         labels = []
-        current_date = start_date
-
-        weekday_names = ["Lun", "Mar", "Mer", "Gio", "Ven", "Sab", "Dom"]
-
-        for _ in range(num_days):
-            weekday = weekday_names[current_date.weekday()]
-            day_month = current_date.strftime("%d/%m")
-            labels.append(f"{weekday} {day_month}")
-            current_date += timedelta(days=1)
+        first_weekday = start_date.weekday()
+        day, month, year = start_date.day, start_date.month, start_date.year
+        month_len = calendar.monthrange(year, month)[1]
+
+        # Solo aritmetica intera: nessun datetime/strftime per giorno
+        for offset in range(num_days):
+            weekday = ITALIAN_WEEKDAYS[(first_weekday + offset) % 7]
+            labels.append(f"{weekday} {day:02d}/{month:02d}")
+            day += 1
+            if day > month_len:
+                day = 1
+                month = month % 12 + 1
+                year += month == 1
+                month_len = calendar.monthrange(year, month)[1]
 
         return labels
 
@@ -92,4 +100,17 @@ def get_next_month_period() -> Tuple[datetime, int, str]:
     month_name = calendar.month_name[start_date.month]
     desc = f"{month_name} {start_date.year} ({days_in_month} giorni)"
 
-    return start_date, days_in_month, desc
\ No newline at end of file
+    return start_date, days_in_month, desc
+
+
+def weekend_pairs(num_days: int, start_weekday: int = 0) -> List[Tuple[int, int]]:
+    """
+    Coppie (sabato, domenica) complete contenute nel periodo.
+
+    :param num_days: giorni del periodo
+    :param start_weekday: giorno della settimana del primo giorno (0=lunedì)
+    :return: lista di tuple (indice_sabato, indice_domenica)
+    """
+    # I sabati formano una progressione aritmetica di passo 7 a partire dal primo
+    first_saturday = (5 - start_weekday) % 7
+    return [(sat, sat + 1) for sat in range(first_saturday, num_days - 1, 7)]
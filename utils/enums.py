@@ -21,6 +21,11 @@ class ShiftType(IntEnum):
         return self.name.capitalize()
 
 
+# Valori interi dei turni, da usare nei cicli al posto dell'enum
+WORKING_SHIFT_VALS = (ShiftType.MORNING.value, ShiftType.AFTERNOON.value, ShiftType.NIGHT.value)  # SMONTO escluso
+ALL_SHIFT_VALS = tuple(s.value for s in ShiftType)
+
+
 class AbsenceType(Enum):
     """Tipologie di assenza (verranno usate in fase successiva)."""
 
@@ -0,0 +1,101 @@
+"""
+utils/ortools_fast.py
+---------------------
+Costruzione del modello CP-SAT senza i controlli sugli argomenti.
+
+Il wrapper Python di OR-Tools valida ogni coefficiente e ogni costante
+(assert_is_int64, assert_is_zero_or_one, ...) a ogni chiamata di
+model.Add / OnlyEnforceIf / operatori aritmetici. I vincoli del registry
+passano sempre interi già validati, quindi durante la costruzione questi
+controlli si possono sostituire con semplici conversioni.
+
+ATTENZIONE: con fast_build() attivo un argomento errato (es. un float come
+coefficiente) non solleva più TypeError ma viene troncato silenziosamente.
+
+add_sum_constraints() scrive invece i vincoli lineari direttamente nel proto,
+senza costruire LinearExpr: adatto a molti vincoli "somma di BoolVar in [lb, ub]".
+add_at_most_one_constraints() fa lo stesso per i vincoli AtMostOne.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Sequence, Tuple
+
+from ortools.sat.python import cp_model
+
+
+def _identity(x):
+    return x
+
+
+# Controlli di cp_model_helper sostituiti dalla sola conversione
+_FAST_CHECKS = {
+    "assert_is_int64": int,
+    "assert_is_int32": int,
+    "assert_is_zero_or_one": int,
+    "assert_is_a_number": _identity,
+}
+
+
+@contextmanager
+def fast_build(enabled: bool = True) -> Iterator[None]:
+    """
+    Context manager che disattiva i controlli sugli argomenti di cp_model
+    e li ripristina all'uscita (anche in caso di eccezione).
+
+    :param enabled: se False non modifica nulla (comodo per renderlo opzionale)
+    """
+    helper = getattr(cp_model, "cmh", None)
+    if not enabled or helper is None:
+        yield
+        return
+
+    originals = {
+        name: getattr(helper, name)
+        for name in _FAST_CHECKS
+        if hasattr(helper, name)
+    }
+    try:
+        for name in originals:
+            setattr(helper, name, _FAST_CHECKS[name])
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(helper, name, fn)
+
+
+def add_sum_constraints(
+        model: cp_model.CpModel,
+        rows: Iterable[Tuple[Sequence[cp_model.IntVar], int, int]],
+) -> None:
+    """
+    Aggiunge in blocco vincoli lb <= sum(vars) <= ub scrivendo i
+    ConstraintProto direttamente nel modello.
+
+    :param model: modello CP-SAT
+    :param rows: tuple (variabili, lb, ub); usare cp_model.INT_MIN/INT_MAX per i lati aperti
+    """
+    add_constraint = model.Proto().constraints.add
+    for variables, lb, ub in rows:
+        linear = add_constraint().linear
+        linear.vars.extend([v.Index() for v in variables])
+        linear.coeffs.extend([1] * len(variables))
+        linear.domain.extend([lb, ub])
+
+
+def add_at_most_one_constraints(
+        model: cp_model.CpModel,
+        groups: Iterable[Sequence[cp_model.IntVar]],
+) -> None:
+    """
+    Aggiunge in blocco vincoli AtMostOne (al più una BoolVar vera per gruppo)
+    scrivendo i ConstraintProto direttamente nel modello: equivalenti a
+    sum(vars) <= 1, ma gestiti come clausole dal nucleo SAT.
+
+    :param model: modello CP-SAT
+    :param groups: gruppi di BoolVar
+    """
+    add_constraint = model.Proto().constraints.add
+    for variables in groups:
+        add_constraint().at_most_one.literals.extend([v.Index() for v in variables])
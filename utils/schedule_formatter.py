@@ -13,6 +13,19 @@ from datetime import datetime
 from model.nurse import Nurse
 from utils.enums import ShiftType
 
+# CORRETTO: Incluso lo smonto nel mapping
+_SHIFT_LETTERS = {
+    'morning': 'M',
+    'afternoon': 'P',
+    'night': 'N',
+    'smonto': 'S'  # AGGIUNTO!
+}
+# Coppie (chiave nello schedule, lettera) calcolate una volta per tutti i piani
+_SHIFT_KEYS = tuple(
+    (shift_type.name.lower(), _SHIFT_LETTERS.get(shift_type.name.lower(), 'R'))
+    for shift_type in ShiftType
+)
+
 
 class ScheduleFormatter:
     """Formattatore professionale per piani turni."""
@@ -60,28 +73,18 @@ class ScheduleFormatter:
         :return: matrice con R=riposo, M=mattino, P=pomeriggio, N=notte, S=smonto
         """
         # Inizializza matrice con R (riposo)
-        matrix = [['R' for _ in range(self.num_days)] for _ in range(len(self.nurses))]
+        matrix = [['R'] * self.num_days for _ in range(len(self.nurses))]
 
         # Mappa nomi -> indici
         name_to_idx = {nurse.name: idx for idx, nurse in enumerate(self.nurses)}
 
         # Riempi matrice dai risultati OR-Tools
         for day_idx, day_data in enumerate(schedule):
-            for shift_type in ShiftType:
-                shift_name = shift_type.name.lower()
-                assigned_nurses = day_data.get(shift_name, [])
-
-                for nurse_name in assigned_nurses:
-                    if nurse_name in name_to_idx:
-                        nurse_idx = name_to_idx[nurse_name]
-                        # CORRETTO: Incluso lo smonto nel mapping
-                        shift_letters = {
-                            'morning': 'M',
-                            'afternoon': 'P',
-                            'night': 'N',
-                            'smonto': 'S'  # AGGIUNTO!
-                        }
-                        matrix[nurse_idx][day_idx] = shift_letters.get(shift_name, 'R')
+            for shift_name, letter in _SHIFT_KEYS:
+                for nurse_name in day_data.get(shift_name, ()):
+                    nurse_idx = name_to_idx.get(nurse_name)
+                    if nurse_idx is not None:
+                        matrix[nurse_idx][day_idx] = letter
 
         return matrix
 